@@ -1,16 +1,17 @@
 import streamlit as st
 import requests
-import openai
-import os
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import folium
 from streamlit_folium import st_folium
-import googlemaps
 
-# Configure OpenAI API key
-openai.api_key = os.environ["OPENAI_API_KEY"]
+from async_clients import as_completed, geocode, start
+from call_policy import resilient_call
+from gazetteer import get_gazetteer
+from parks_store import dataset_version, load_index, park_address, partition_version, partitions_for, read_partition
+from recommender import SHAPE_COMPACTNESS, SIZE_ACRES, Preferences, get_recommender
+from trail_summaries import SummaryStore, generate_summary
 
 # Configure page
 st.set_page_config(
@@ -59,31 +60,33 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Initialize Google Maps client
-gmaps = googlemaps.Client(key=os.environ["GOOGLE_MAPS_API_KEY"]) # Echoing the Google Maps API key like OpenAI API key # Replace with your Google Maps API key
+def locate_trail(trail_data):
+    """Geocode a trail's address. Returns (lat, lng, warning message or None).
 
-def get_trail_summary(trail_data):
+    Trails without a street address, and addresses the geocoder can't place,
+    are shown at the center of their ZIP or city from the offline gazetteer.
+    """
+    lat, lng, area = get_gazetteer().locate(trail_data)
+    selected_address = park_address(trail_data)
+    if selected_address is None:
+        return lat, lng, f"No street address on file; showing the center of {area}."
     try:
-        trail_info = "\n".join([f"{key}: {value}" for key, value in trail_data.items()])
-        prompt = f"""Analyze the following trail information and provide a concise summary including:
-        - Trail highlights
-        - Key features
-        - Best times to visit
-        - Any notable information
-        
-        Trail Data:
-        {trail_info}"""
-        
-        completion = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a knowledgeable park ranger providing helpful trail information."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        return completion.choices[0].message["content"]
+        geocode_result = resilient_call("geocode", geocode, selected_address, hedge=True)
     except Exception as e:
-        return f"Error generating summary: {e}"
+        return lat, lng, f"Geocoding failed ({e}); showing the center of {area}."
+    if not geocode_result:
+        return lat, lng, f"Could not geocode address: {selected_address}; showing the center of {area}."
+    location = geocode_result[0]['geometry']['location']
+    return location['lat'], location['lng'], None
+
+def find_nearby_parks(parks, trail_data, name_column, city_column, limit=5):
+    """Other parks in the same city as the selected trail, largest first."""
+    same_city = parks[(parks[city_column] == trail_data.get(city_column))
+                      & (parks[name_column] != trail_data.get(name_column))]
+    columns = [col for col in [name_column, city_column, 'status', 'acres'] if col in parks.columns]
+    if 'acres' in parks.columns:
+        same_city = same_city.sort_values('acres', ascending=False)
+    return same_city[columns].head(limit)
 
 # Main header
 st.markdown("""
@@ -95,16 +98,44 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-# Load data
+@st.cache_resource
+def get_summary_store():
+    """Precomputed summaries written by batch_summarize.py (reloaded when the file changes)."""
+    return SummaryStore()
+
+@st.cache_resource(max_entries=1)
+def get_parks_index(version):
+    """Name/city index of every park, shared by every session until the store is refreshed."""
+    return load_index()
+
+@st.cache_resource(max_entries=64)
+def get_partition(partition, version):
+    """Memory-mapped parks of one city, shared by every session (cache_resource doesn't copy it per rerun).
+
+    `version` is the partition file's own mtime, so a refresh only reloads the cities it rewrote.
+    """
+    return read_partition(partition)
+
+@st.cache_resource(max_entries=32)
+def combine_partitions(partitions, columns):
+    """One frame of the given (partition, version) pairs, built once and shared by every session."""
+    frames = [get_partition(name, version) for name, version in partitions]
+    frames = [frame for frame in frames if not frame.empty]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(columns))
+
+def get_parks(cities=None):
+    """Parks in the selected cities (all parks if none are selected), loading only their partitions."""
+    index = get_parks_index(dataset_version())
+    partitions = tuple((name, partition_version(name)) for name in partitions_for(index, cities))
+    return combine_partitions(partitions, tuple(index.columns))
+
+# Load the lightweight index used by the selectors
 try:
-    df = pd.read_csv("Parks.csv")
-    
-    # Ensure consistent column naming
-    df.columns = df.columns.str.strip().str.lower()
-    
-    
+    parks_index = get_parks_index(dataset_version())
 except Exception as e:
-    st.error(f"Error loading CSV file: {e}")
+    st.error(f"Error loading parks data: {e}")
     st.stop()
 
 # Sidebar styling
@@ -116,32 +147,57 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     
     # Find city column
-    city_column = next((col for col in df.columns if col.lower() in ['city', 'location']), None)
+    city_column = next((col for col in parks_index.columns if col.lower() in ['city', 'location']), None)
     if city_column:
-        cities = sorted(df[city_column].dropna().unique())
+        cities = sorted(parks_index[city_column].dropna().unique())
         selected_cities = st.multiselect("Select Cities", cities)
     
 
 
-# Filter dataframe
-filtered_df = df[df[city_column].isin(selected_cities)] if selected_cities else df
-
-# Main content
-st.markdown("<h3 style='color: black;'>Filtered Trails</h3>", unsafe_allow_html=True)
-st.dataframe(filtered_df)
+# Load only the partitions of the selected cities
+filtered_df = get_parks(selected_cities)
 
-if not filtered_df.empty:
-    st.markdown("<h3 style='color: black;'>Trail Details</h3>", unsafe_allow_html=True)
+@st.fragment
+def trail_map(trail_name, lat, lng, warning):
+    """Folium map for the selected trail; map interactions rerun only this fragment."""
+    if warning:
+        st.warning(warning)
+    # Create Folium map with geocoded or fallback coordinates (approximate points get a wider view)
+    m = folium.Map(location=[lat, lng], zoom_start=12 if warning else 15, 
+                   tiles="OpenStreetMap", 
+                   attr="Map tiles by OpenStreetMap contributors.")
+    folium.Marker([lat, lng], popup=trail_name).add_to(m)
     
-    # Trail selector
-    trail_name_column = next((col for col in df.columns 
-                            if col.lower() in ['park_name', 'trail_name', 'name']), df.columns[0])
+    # Display the map in Streamlit (nothing is read back, so panning doesn't trigger reruns)
+    st_folium(m, width="100%", height=500, returned_objects=[])
+
+def show_summary(slot, served):
+    """Render a summary and the model that wrote it into `slot`."""
+    with slot.container():
+        st.markdown(f'<div class="trail-info">{served.result}</div>', unsafe_allow_html=True)
+        st.caption(f"Written by {served.model}" + (" (fallback)" if served.fallback else ""))
+
+@st.fragment
+def trail_details(filtered_df, trail_name_column, city_column):
+    """Trail selector, detail panel and map; picking a trail reruns only this fragment."""
     trail_names = sorted(filtered_df[trail_name_column].unique())
     selected_trail = st.selectbox("Select a trail for detailed information", trail_names)
     
     if selected_trail:
         trail_data = filtered_df[filtered_df[trail_name_column] == selected_trail].iloc[0].to_dict()
         
+        # Start the independent lookups together; each panel renders as soon as its result arrives
+        summaries = st.session_state.setdefault("trail_summaries", {})
+        if precomputed := get_summary_store().lookup(trail_data):
+            summaries[selected_trail] = precomputed
+        lookups = {
+            start(locate_trail, trail_data): "map",
+            start(find_nearby_parks, get_parks([trail_data[city_column]]), trail_data,
+                  trail_name_column, city_column): "nearby",
+        }
+        if selected_trail not in summaries:
+            lookups[start(generate_summary, trail_data)] = "summary"
+        
         col1, col2 = st.columns([2, 1])
         with col1:
             st.markdown("<h4 style='color: black;'>Trail Information</h4>", unsafe_allow_html=True)
@@ -154,33 +210,95 @@ if not filtered_df.empty:
         
         with col2:
             st.markdown("<h4 style='color: black;'>AI Trail Summary</h4>", unsafe_allow_html=True)
-            if st.button("Generate Trail Summary"):
-                with st.spinner("Generating summary..."):
-                    summary = get_trail_summary(trail_data)
-                    st.markdown(f'<div class="trail-info">{summary}</div>', unsafe_allow_html=True)
-
-    # Map visualization using Google Maps API
-    if 'address' in trail_data and 'zip code' in trail_data:
-        selected_address = f"{trail_data['address']}, {trail_data['city']}, {trail_data['zip code']}"
-        geocode_result = gmaps.geocode(selected_address)
-        if geocode_result:
-            lat = geocode_result[0]['geometry']['location']['lat']
-            lng = geocode_result[0]['geometry']['location']['lng']
+            summary_slot = st.empty()
+            if selected_trail in summaries:
+                show_summary(summary_slot, summaries[selected_trail])
+            else:
+                summary_slot.info("Generating summary...")
+            st.markdown("<h4 style='color: black;'>Nearby Parks</h4>", unsafe_allow_html=True)
+            nearby_slot = st.empty()
+        
+        map_slot = st.empty()
+        map_slot.info("Locating trail...")
+        
+        for future in as_completed(lookups):
+            lookup = lookups[future]
+            if lookup == "summary":
+                try:
+                    summaries[selected_trail] = future.result()
+                    show_summary(summary_slot, summaries[selected_trail])
+                except Exception as e:
+                    summary_slot.error(f"Error generating summary: {e}")
+            elif lookup == "nearby":
+                nearby = future.result()
+                if nearby.empty:
+                    nearby_slot.markdown("<div class='trail-info'>No other parks in this city.</div>", unsafe_allow_html=True)
+                else:
+                    nearby_slot.dataframe(nearby, hide_index=True)
+            else:
+                with map_slot.container():
+                    trail_map(selected_trail, *future.result())
+
+@st.fragment
+def trail_recommendations(selected_cities):
+    """Preference form and best matches; changing a preference reruns only this fragment."""
+    recommender = get_recommender()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        size = st.selectbox("Park size", ["Any"] + list(SIZE_ACRES))
+    with col2:
+        shape = st.selectbox("Park shape", ["Any"] + list(SHAPE_COMPACTNESS))
+    with col3:
+        prefer_open = st.checkbox("Prefer open parks", value=True)
+    # A search box rather than a selectbox of every park name, which would be resent on every rerun
+    like_query = st.text_input("Similar to", placeholder="Search a park by name")
+    like = None
+    if like_query:
+        matches = recommender.search(like_query)
+        labels = {row.park_name if pd.isna(row.city) else f"{row.park_name} ({row.city})": int(row.objectid)
+                  for row in matches.itertuples()}
+        if labels:
+            like = labels[st.selectbox("Matching parks", list(labels))]
         else:
-            st.warning(f"Could not geocode address: {selected_address}")
-            lat, lng = 37.7749, -122.4194  # Default to San Francisco coordinates
-    else:
-        st.warning("Selected trail does not have a valid address or zip code.")
-        lat, lng = 37.7749, -122.4194  # Default to San Francisco coordinates
-
-    # Create Folium map with hardcoded coordinates or geocoded coordinates
-    m = folium.Map(location=[lat, lng], zoom_start=15, 
-                   tiles="OpenStreetMap", 
-                   attr="Map tiles by OpenStreetMap contributors.")
-    folium.Marker([lat, lng], popup="Test Location").add_to(m)
+            st.caption("No park matches that name.")
+    prefs = Preferences(
+        acres=SIZE_ACRES.get(size),
+        compactness=SHAPE_COMPACTNESS.get(shape),
+        cities=selected_cities or (),
+        statuses=["open"] if prefer_open else (),
+        like=like,
+    )
+    st.dataframe(recommender.recommend(prefs, k=5), hide_index=True, use_container_width=True)
+
+@st.fragment
+def trail_analytics(filtered_df):
+    """Metric selector and average; changing the metric reruns only this fragment."""
+    st.markdown("<h4 style='color: black;'>Analytics</h4>", unsafe_allow_html=True)
+    numeric_cols = filtered_df.select_dtypes(include=[np.number]).columns
+    if len(numeric_cols) > 0:
+        selected_metric = st.selectbox("Select metric to analyze", numeric_cols, 
+            key="metric_selector")
+        avg_value = filtered_df[selected_metric].mean()
+        st.markdown(f"""
+            <div style='color: black; font-size: 1.1em;'>
+                <p><strong>Average {selected_metric.replace('_', ' ').title()}:</strong> {avg_value:,.2f}</p>
+            </div>
+        """, unsafe_allow_html=True)
 
-    # Display the map in Streamlit
-    st_folium(m, width="100%", height=500)
+# Main content
+st.markdown("<h3 style='color: black;'>Filtered Trails</h3>", unsafe_allow_html=True)
+st.dataframe(filtered_df)
+
+if not filtered_df.empty:
+    st.markdown("<h3 style='color: black;'>Trail Details</h3>", unsafe_allow_html=True)
+    
+    # Trail selector
+    trail_name_column = next((col for col in filtered_df.columns 
+                            if col.lower() in ['park_name', 'trail_name', 'name']), filtered_df.columns[0])
+    trail_details(filtered_df, trail_name_column, city_column)
+
+st.markdown("<h3 style='color: black;'>Recommended for You</h3>", unsafe_allow_html=True)
+trail_recommendations(selected_cities)
 
 # Trail statistics
 st.markdown("<h3 style='color: black;'>Trail Statistics</h3>", unsafe_allow_html=True)
@@ -200,14 +318,4 @@ with col1:
     """, unsafe_allow_html=True)
 
 with col2:
-    st.markdown("<h4 style='color: black;'>Analytics</h4>", unsafe_allow_html=True)
-    numeric_cols = filtered_df.select_dtypes(include=[np.number]).columns
-    if len(numeric_cols) > 0:
-        selected_metric = st.selectbox("Select metric to analyze", numeric_cols, 
-            key="metric_selector")
-        avg_value = filtered_df[selected_metric].mean()
-        st.markdown(f"""
-            <div style='color: black; font-size: 1.1em;'>
-                <p><strong>Average {selected_metric.replace('_', ' ').title()}:</strong> {avg_value:,.2f}</p>
-            </div>
-        """, unsafe_allow_html=True)
+    trail_analytics(filtered_df)
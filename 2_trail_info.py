@@ -1,17 +1,19 @@
 import streamlit as st
 import streamlit as st
 import requests
-import os
 import pandas as pd
 import numpy as np
+from dataclasses import asdict
 from datetime import datetime
+from typing import Optional
 import folium
 from streamlit_folium import st_folium
 import googlemaps
-import openai
 
-# Initialize OpenAI client
-openai.api_key = os.environ["OPENAI_API_KEY"]
+from async_clients import chat
+from cache_backend import get_cache
+from model_router import Served, routed
+from session_store import chat_panel
 
 # Sidebar Enhancement
 with st.sidebar:
@@ -21,21 +23,7 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
     
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-    
-    # Chat container
-    messages = st.container()
-    with messages:
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                with st.chat_message("user"):
-                    st.write(message["content"])
-    
-    # Chat input with styling
-    prompt = st.chat_input("Ask about trails...")
-    if prompt:
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
+    chat_panel()
 
 
 # Apply the same nature-themed styling with black text
@@ -113,20 +101,28 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def get_hiking_info(category, model="gpt-4o-2024-08-06") -> str:
+# Generated guides are shared by every worker and refreshed weekly; fallback answers hourly
+HIKING_INFO_TTL_SECONDS = 7 * 24 * 3600
+FALLBACK_TTL_SECONDS = 3600
+
+def get_hiking_info(category) -> Optional[Served]:
     """
-    Generate hiking information using OpenAI's GPT-4.
+    Generate hiking information with the model chosen by the router.
     
     Args:
         category (str): The hiking topic to get information about
-        model (str): The GPT model to use
         
     Returns:
-        str: Generated information about the hiking topic
+        Served: Generated information about the hiking topic and the model that wrote it
     """
+    cache = get_cache()
+    if cached := cache.get("hiking_info", {"category": category}):
+        return Served(**cached)
     try:
-        completion = openai.ChatCompletion.create(
-            model=model,
+        served = routed(
+            "hiking_info",
+            chat,
+            hedge=True,
             messages=[
                 {
                     "role": "system",
@@ -138,10 +134,12 @@ def get_hiking_info(category, model="gpt-4o-2024-08-06") -> str:
                 }
             ]
         )
-        return completion.choices[0].message.content
     except Exception as e:
         st.error(f"Error generating information: {e}")
         return None
+    cache.set("hiking_info", {"category": category}, asdict(served),
+              ttl=FALLBACK_TTL_SECONDS if served.fallback else HIKING_INFO_TTL_SECONDS)
+    return served
 
 # Main header
 st.markdown("""
@@ -198,10 +196,11 @@ if category:
             st.markdown(f"""
                 <div class="info-card">
                     <div class="generated-content">
-                        {response}
+                        {response.result}
                     </div>
                 </div>
             """, unsafe_allow_html=True)
+            st.caption(f"Written by {response.model}" + (" (fallback)" if response.fallback else ""))
             
             st.markdown("""
                 <div class="pro-tip">
@@ -7,12 +7,22 @@ from datetime import datetime
 import folium
 from streamlit_folium import st_folium
 import googlemaps
-import openai
 import base64
-from typing import List, Optional
+import hashlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from PIL import Image
 
-# Initialize OpenAI client
-openai.api_key = os.environ["OPENAI_API_KEY"]
+from async_clients import chat, generate_image
+from cache_backend import get_cache
+from call_policy import ENDPOINT_TIMEOUTS, resilient_call
+from image_assets import DEFAULT_DISPLAY_WIDTH, display_asset, make_derivative, original_path, register, store_original
+from job_queue import FAILED, JobLimitError, get_job_queue
+from model_router import Served, routed
+from session_store import blob_path, chat_panel, put_blob, session_id
+from species_catalog import cached_facts, get_catalog, normalize, species_facts
 
 # Configure page
 st.set_page_config(
@@ -29,21 +39,7 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
     
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-    
-    # Chat container
-    messages = st.container()
-    with messages:
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                with st.chat_message("user"):
-                    st.write(message["content"])
-    
-    # Chat input with styling
-    prompt = st.chat_input("Ask about trails...")
-    if prompt:
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
+    chat_panel()
 
 # Enhanced CSS with nature theme
 st.markdown("""
@@ -136,61 +132,86 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Creek Trail Species Data
-CREEK_TRAIL_SPECIES = {
-    "Plant": {
-        "Trees": ["Western Red Cedar", "Red Alder", "Big Leaf Maple", "Western Hemlock", "Black Cottonwood"],
-        "Shrubs": ["Salmonberry", "Oregon Grape", "Red Elderberry", "Thimbleberry", "Indian Plum"],
-        "Ferns & Ground Cover": ["Sword Fern", "Lady Fern", "Maidenhair Fern", "Wild Ginger", "False Solomon's Seal"],
-        "Wildflowers": ["Trillium", "Stream Violet", "Skunk Cabbage", "Pacific Bleeding Heart", "Wood Sorrel"]
-    },
-    "Animal": {
-        "Birds": ["American Dipper", "Great Blue Heron", "Belted Kingfisher", "Wood Duck", "Pacific Wren"],
-        "Mammals": ["River Otter", "Black-tailed Deer", "Raccoon", "Douglas Squirrel", "Beaver"],
-        "Amphibians": ["Pacific Tree Frog", "Red-legged Frog", "Pacific Giant Salamander", "Rough-skinned Newt", "Western Toad"],
-        "Fish": ["Cutthroat Trout", "Coho Salmon", "Steelhead", "Pacific Lamprey", "Sculpin"]
-    }
-}
+# Background jobs are polled this often while any are still running
+JOB_POLL_SECONDS = 2
+JOB_HISTORY_LIMIT = 5
+
+# Photos analyzed in parallel within one batch, and the size they are sent at
+BATCH_CONCURRENCY = 6
+ANALYSIS_MAX_SIDE = 1024
 
 # Helper Functions
-def encode_uploaded_image(uploaded_file) -> str:
-    """Encode uploaded image to base64 string."""
-    return base64.b64encode(uploaded_file.getbuffer()).decode('utf-8')
+def encode_image(image_data: bytes) -> str:
+    """Encode image bytes to base64 string."""
+    return base64.b64encode(image_data).decode('utf-8')
 
-def analyze_image(uploaded_file) -> str:
-    """Analyze uploaded image using OpenAI's GPT-4 Vision."""
-    try:
-        base64_image = encode_uploaded_image(uploaded_file)
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[{
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "What is in this image? Please identify and describe any plants, animals, and natural features."},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
-                ]
-            }]
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error analyzing image: {str(e)}"
+def preprocess_image(image_data: bytes) -> bytes:
+    """Downscale a photo to the size the vision model needs and re-encode it as JPEG."""
+    with Image.open(io.BytesIO(image_data)) as image:
+        image.thumbnail((ANALYSIS_MAX_SIDE, ANALYSIS_MAX_SIDE))
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+def analyze_image(image_data: bytes) -> Served:
+    """Analyze a JPEG image with the routed vision model. Runs on the background job queue, so errors are raised."""
+    base64_image = encode_image(image_data)
+    return routed(
+        "image_analysis",
+        chat,
+        messages=[{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "What is in this image? Please identify and describe any plants, animals, and natural features."},
+                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+            ]
+        }]
+    )
+
+def analyze_batch(photos: List[Tuple[str, bytes]], rows: List[dict]) -> List[dict]:
+    """Analyze photos in parallel, updating `rows` in place as each one finishes."""
+    def analyze_one(row: dict, image_data: bytes) -> None:
+        row["status"] = "running"
+        start = time.perf_counter()
+        try:
+            prepared = preprocess_image(image_data)
+            key = hashlib.sha256(prepared).hexdigest()
+            # Analyses are shared by every worker, keyed by the photo as it is sent
+            analysis = cache.get("image_analysis", key)
+            if analysis is None:
+                served = analyze_image(prepared)
+                analysis = {"result": served.result, "model": served.model}
+                cache.set("image_analysis", key, analysis)
+            else:
+                row["cached"] = True
+            row["result"], row["model"], row["status"] = analysis["result"], analysis["model"], "done"
+        except Exception as e:
+            row["result"], row["status"] = f"Error analyzing image: {e}", FAILED
+        finally:
+            row["seconds"] = time.perf_counter() - start
+
+    cache = get_cache()
+    with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as pool:
+        list(pool.map(analyze_one, rows, [image_data for _, image_data in photos]))
+    return rows
 
 def download_image(filename: str, url: str) -> None:
     """Download image from URL and save to file."""
-    response = requests.get(url)
+    response = resilient_call("download_image", requests.get, url,
+                              timeout=ENDPOINT_TIMEOUTS["download_image"][2])
     if response.status_code == 200:
-        with open(filename, 'wb') as file:
-            file.write(response.content)
+        store_original(filename, response.content)
     else:
-        st.error(f"Error downloading image from URL: {url}")
+        raise RuntimeError(f"Error downloading image from URL: {url}")
 
 def filename_from_input(prompt: str) -> str:
-    """Generate filename from input prompt."""
-    alphanum = "".join(char if char.isalnum() or char == " " else "" for char in prompt)
-    return "_".join(alphanum.split()[:3])
+    """Filename stem for a species name: a readable prefix plus a hash of the whole normalized name."""
+    key = normalize(prompt)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return "_".join(key.split()[:3] + [digest])
 
-def get_image(prompt: str, category: str, model: str = "dall-e-3") -> Optional[List[str]]:
-    """Generate image using OpenAI's DALL-E."""
+def get_image(prompt: str, category: str) -> List[str]:
+    """Generate image using OpenAI's DALL-E. Runs on the background job queue, so errors are raised."""
     if category == "Plant":
         base_prompt = "Detailed botanical illustration of"
     else:
@@ -198,22 +219,218 @@ def get_image(prompt: str, category: str, model: str = "dall-e-3") -> Optional[L
         
     full_prompt = f"{base_prompt} {prompt} in its natural creek trail habitat, photorealistic style"
     
+    # Corrected method for generating an image
+    image_urls = routed(
+        "image_generation",
+        generate_image,
+        interactive=False,
+        prompt=full_prompt,
+        n=1,
+        size="1024x1024"
+    ).result
+    filenames = []
+    for i, image_url in enumerate(image_urls):
+        filename = original_path(f"{filename_from_input(prompt)}_{i + 1}.png")
+        download_image(filename, image_url)
+        register(filename)
+        filenames.append(filename)
+    return filenames
+
+def cached_illustration(prompt: str) -> Optional[List[str]]:
+    """Illustration already generated for this exact species name, if still stored."""
+    filename = original_path(f"{filename_from_input(prompt)}_1.png")
+    return [filename] if display_asset(filename) else None
+
+def remember_finished_job(state_key: str, result, **details) -> None:
+    """Record an already-available result alongside the session's jobs."""
+    jobs = st.session_state.setdefault(state_key, [])
+    jobs.append({"job_id": None, "status": "done", "result": result, "error": None, **details})
+    del jobs[:-JOB_HISTORY_LIMIT]
+
+def submit_job(state_key: str, kind: str, fn, *args, **details) -> None:
+    """Queue a background job and remember its id in the session."""
     try:
-        # Corrected method for generating an image
-        images = openai.Image.create(
-            prompt=full_prompt,
-            n=1,
-            size="1024x1024"
+        job_id = get_job_queue().submit(session_id(), kind, fn, *args)
+    except JobLimitError as e:
+        st.warning(str(e))
+        return
+    jobs = st.session_state.setdefault(state_key, [])
+    jobs.append({"job_id": job_id, "status": "queued", **details})
+    del jobs[:-JOB_HISTORY_LIMIT]
+
+def has_pending_jobs(state_key: str) -> bool:
+    """Whether any job tracked under `state_key` is still queued or running."""
+    return any(entry["status"] in ("queued", "running") for entry in st.session_state.get(state_key, []))
+
+def refresh_jobs(state_key: str) -> None:
+    """Copy status and results of finished jobs from the queue into the session."""
+    queue = get_job_queue()
+    for entry in st.session_state.get(state_key, []):
+        if entry["status"] not in ("queued", "running"):
+            continue
+        job = queue.get(entry["job_id"])
+        if job is None:
+            entry["status"], entry["error"] = FAILED, "Job expired before it finished."
+            continue
+        entry["status"], entry["elapsed"] = job.status, job.elapsed
+        if not job.active:
+            entry["result"], entry["error"] = job.result, job.error
+
+def show_illustration(entry: dict) -> None:
+    if entry["status"] in ("queued", "running"):
+        st.info(f"Creating illustration of {entry['species']}... ({entry['status']}, {entry.get('elapsed', 0):.0f}s)")
+    elif entry["status"] == FAILED:
+        st.error(f"Error generating image: {entry['error']}")
+    else:
+        st.markdown(f"<h4 style='color: black;'>Your {entry['category']} Illustration:</h4>", unsafe_allow_html=True)
+        for filename in entry["result"]:
+            if asset := display_asset(filename):
+                st.image(asset, use_column_width=True)
+                st.markdown(
+                    f"<p class='caption'>AI-generated illustration of {entry['species']} in its natural habitat</p>",
+                    unsafe_allow_html=True
+                )
+            else:
+                st.warning("Could not generate illustration. Please try again.")
+
+def show_analysis(entry: dict) -> None:
+    rows = entry["rows"]
+    finished = [row for row in rows if row["status"] in ("done", FAILED)]
+    st.markdown(f"<h4 style='color: black;'>Analysis Results ({len(finished)}/{len(rows)} photos)</h4>", unsafe_allow_html=True)
+    if entry["status"] in ("queued", "running"):
+        st.progress(len(finished) / len(rows), text=f"Analyzing photos... ({entry.get('elapsed', 0):.0f}s)")
+    elif entry["status"] == FAILED:
+        st.error(f"Error analyzing images: {entry['error']}")
+    st.dataframe(pd.DataFrame([{
+        "Photo": row["name"],
+        "Status": "cached" if row.get("cached") else row["status"],
+        "Seconds": round(row["seconds"], 1) if "seconds" in row else None,
+        "Model": row.get("model"),
+        "Summary": (row.get("result") or "")[:120],
+    } for row in rows]), hide_index=True, use_container_width=True)
+    for row in finished:
+        with st.expander(f"🔍 {row['name']}"):
+            st.markdown(
+                f"<div class='analysis-result'>{row['result']}</div>",
+                unsafe_allow_html=True
+            )
+    if finished:
+        st.info("💡 Analysis powered by AI. Always verify findings with local expertise.")
+
+def show_jobs(state_key: str, show_entry, polling: bool) -> None:
+    """Render a session's jobs, newest first; stop polling once all have finished."""
+    refresh_jobs(state_key)
+    for entry in reversed(st.session_state.get(state_key, [])):
+        show_entry(entry)
+    if polling and not has_pending_jobs(state_key):
+        st.rerun()
+
+def job_panel(state_key: str, show_entry) -> None:
+    """Job list that auto-refreshes on its own while jobs are pending."""
+    polling = has_pending_jobs(state_key)
+    st.fragment(show_jobs, run_every=JOB_POLL_SECONDS if polling else None)(state_key, show_entry, polling)
+
+
+@st.fragment
+def illustration_tab():
+    """Generate Illustrations tab; its widgets rerun only this fragment."""
+    st.markdown("<h3 style='color: black;'>Generate Species Illustrations</h3>", unsafe_allow_html=True)
+    st.markdown("""
+        <p style='color: black;'>
+        1. Search for a species, or browse by category (Plant/Animal)<br>
+        2. Choose a specific species or enter your own<br>
+        3. Click 'Generate' to create a detailed illustration
+        </p>
+    """, unsafe_allow_html=True)
+    
+    catalog = get_catalog()
+    species = None
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        category = st.selectbox("Choose category", catalog.categories())
+
+    with col2:
+        query = st.text_input("Search species", placeholder="Start typing, e.g. heron or salmonberry")
+        if query:
+            # Autocomplete across every category; typos still find the closest species
+            matches = catalog.search(query)
+        else:
+            subcategory = st.selectbox(
+                f"Select {category.lower()} type",
+                catalog.subcategories(category)
+            )
+            matches = catalog.species_in(category, subcategory)
+        species_selection = st.selectbox(
+            "Select species or enter custom",
+            ["Custom Entry"] + [match.name for match in matches],
+            index=1 if query and matches else 0
         )
-        filenames = []
-        for i, image_data in enumerate(images['data']):
-            filename = f"{filename_from_input(prompt)}_{i + 1}.png"
-            download_image(filename, image_data['url'])
-            filenames.append(filename)
-        return filenames
-    except Exception as e:
-        st.error(f"Error generating image: {e}")
-        return None
+        
+        if species_selection == "Custom Entry":
+            species_description = st.text_input(
+                f"Enter custom {category.lower()} description",
+                placeholder=f"e.g., {catalog.species_in(category)[0].name}"
+            )
+            if species_description and (species := catalog.resolve(species_description)):
+                st.caption(f"Matched catalog species: {species.name}")
+                species_description = species.name
+        else:
+            species = next(match for match in matches if match.name == species_selection)
+            species_description = species.name
+
+    if species:
+        category = species.category
+        with st.expander(f"📋 Quick facts: {species.name}"):
+            if facts := cached_facts(species):
+                st.markdown(facts)
+            elif st.button("Get quick facts", key="species_facts"):
+                try:
+                    st.markdown(species_facts(species))
+                except Exception as e:
+                    st.error(f"Error getting species facts: {e}")
+
+    if st.button("🎨 Generate Illustration", type="primary") and species_description:
+        if species and (filenames := cached_illustration(species.name)):
+            remember_finished_job("illustration_jobs", filenames, species=species.name, category=category)
+        else:
+            submit_job("illustration_jobs", "illustration", get_image, species_description, category,
+                       species=species_description, category=category)
+    job_panel("illustration_jobs", show_illustration)
+
+@st.fragment
+def analysis_tab():
+    """Analyze Images tab; its widgets rerun only this fragment."""
+    st.markdown("<h3 style='color: black;'>Analyze Trail Images</h3>", unsafe_allow_html=True)
+    st.markdown("""
+        <p style='color: black;'>
+        1. Upload one or more photos from your trail explorations<br>
+        2. Click 'Analyze' to identify species<br>
+        3. Get detailed information about what's in each image as it finishes
+        </p>
+    """, unsafe_allow_html=True)
+    
+    uploaded_files = st.file_uploader(
+        "Upload trail images",
+        type=['jpg', 'jpeg', 'png'],
+        accept_multiple_files=True,
+        help="Upload clear photos of plants, animals, or landscapes from your trail adventures"
+    )
+    
+    if uploaded_files:
+        # Keep the photo bytes on disk rather than in session memory
+        upload_keys = [put_blob(uploaded.getvalue(), os.path.splitext(uploaded.name)[1]) for uploaded in uploaded_files]
+        if len(upload_keys) == 1:
+            st.image(make_derivative(blob_path(upload_keys[0]), DEFAULT_DISPLAY_WIDTH), caption="Your uploaded image", use_column_width=True)
+        else:
+            st.image([make_derivative(blob_path(key), 256) for key in upload_keys],
+                     caption=[uploaded.name for uploaded in uploaded_files], width=160)
+        
+        label = "🔍 Analyze Image" if len(uploaded_files) == 1 else f"🔍 Analyze {len(uploaded_files)} Images"
+        if st.button(label, type="primary"):
+            photos = [(uploaded.name, uploaded.getvalue()) for uploaded in uploaded_files]
+            rows = [{"name": name, "status": "queued"} for name, _ in photos]
+            submit_job("analysis_jobs", "analysis", analyze_batch, photos, rows, rows=rows)
+    job_panel("analysis_jobs", show_analysis)
 
 
 def main():
@@ -231,79 +448,10 @@ def main():
     tab1, tab2 = st.tabs(["🎨 Generate Illustrations", "🔍 Analyze Images"])
 
     with tab1:
-        st.markdown("<h3 style='color: black;'>Generate Species Illustrations</h3>", unsafe_allow_html=True)
-        st.markdown("""
-            <p style='color: black;'>
-            1. Select a category (Plant/Animal)<br>
-            2. Choose a specific species or enter your own<br>
-            3. Click 'Generate' to create a detailed illustration
-            </p>
-        """, unsafe_allow_html=True)
-        
-        col1, col2 = st.columns([1, 2])
-        with col1:
-            category = st.selectbox("Choose category", ["Plant", "Animal"])
-
-        with col2:
-            subcategory = st.selectbox(
-                f"Select {category.lower()} type",
-                list(CREEK_TRAIL_SPECIES[category].keys())
-            )
-            species_selection = st.selectbox(
-                "Select species or enter custom",
-                ["Custom Entry"] + CREEK_TRAIL_SPECIES[category][subcategory]
-            )
-            
-            if species_selection == "Custom Entry":
-                species_description = st.text_input(
-                    f"Enter custom {category.lower()} description",
-                    placeholder=f"e.g., {CREEK_TRAIL_SPECIES[category][subcategory][0]}"
-                )
-            else:
-                species_description = species_selection
-
-        if st.button("🎨 Generate Illustration", type="primary") and species_description:
-            with st.spinner(f"Creating illustration of {species_description}..."):
-                if image_filenames := get_image(species_description, category):
-                    st.markdown(f"<h4 style='color: black;'>Your {category} Illustration:</h4>", unsafe_allow_html=True)
-                    for filename in image_filenames:
-                        if os.path.exists(filename):
-                            st.image(filename, use_column_width=True)
-                            st.markdown(
-                                f"<p class='caption'>AI-generated illustration of {species_description} in its natural habitat</p>",
-                                unsafe_allow_html=True
-                            )
-                        else:
-                            st.warning("Could not generate illustration. Please try again.")
+        illustration_tab()
 
     with tab2:
-        st.markdown("<h3 style='color: black;'>Analyze Trail Images</h3>", unsafe_allow_html=True)
-        st.markdown("""
-            <p style='color: black;'>
-            1. Upload a photo from your trail explorations<br>
-            2. Click 'Analyze' to identify species<br>
-            3. Get detailed information about what's in your image
-            </p>
-        """, unsafe_allow_html=True)
-        
-        uploaded_file = st.file_uploader(
-            "Upload a trail image",
-            type=['jpg', 'jpeg', 'png'],
-            help="Upload a clear photo of plants, animals, or landscapes from your trail adventures"
-        )
-        
-        if uploaded_file:
-            st.image(uploaded_file, caption="Your uploaded image", use_column_width=True)
-            
-            if st.button("🔍 Analyze Image", type="primary"):
-                with st.spinner("Analyzing your image..."):
-                    if analysis_result := analyze_image(uploaded_file):
-                        st.markdown("<h4 style='color: black;'>Analysis Results</h4>", unsafe_allow_html=True)
-                        st.markdown(
-                            f"<div class='analysis-result'>{analysis_result}</div>",
-                            unsafe_allow_html=True
-                        )
-                        st.info("💡 Analysis powered by AI. Always verify findings with local expertise.")
+        analysis_tab()
 
     # Nature-themed footer
     st.markdown("""
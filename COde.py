@@ -1,7 +1,8 @@
 import streamlit as st
 import requests
 import os
-from openai import OpenAI
+
+from session_store import chat_panel
 
 # Configure Streamlit theme
 st.set_page_config(
@@ -72,9 +73,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Initialize OpenAI client
-client = OpenAI(api_key='')
-
 # Main header with enhanced styling
 st.markdown("""
     <div class="main-header">
@@ -104,21 +102,7 @@ with st.sidebar:
         </div>
     """, unsafe_allow_html=True)
     
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-    
-    # Chat container
-    messages = st.container()
-    with messages:
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                with st.chat_message("user"):
-                    st.write(message["content"])
-    
-    # Chat input with styling
-    prompt = st.chat_input("Ask about trails...")
-    if prompt:
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
+    chat_panel()
 
 # Feature cards with enhanced styling
 st.markdown("<h2 style='color: black;'>🎯 Explore Our Features</h2>", unsafe_allow_html=True)
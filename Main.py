@@ -1,5 +1,3 @@
-import os
-import openai
 import base64
 from typing import List, Optional
 import streamlit as st
@@ -11,6 +9,8 @@ import folium
 from streamlit_folium import st_folium
 import googlemaps
 
+from session_store import chat_panel
+
 # Configure Streamlit theme
 st.set_page_config(
     page_title="Creekside Trail Explorer",
@@ -68,9 +68,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Initialize OpenAI client
-openai.api_key = os.environ["OPENAI_API_KEY"]
-
 # Main header with enhanced styling
 st.markdown("""
     <div class="main-header">
@@ -100,21 +97,7 @@ with st.sidebar:
         </div>
     """, unsafe_allow_html=True)
     
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-    
-    # Chat container
-    messages = st.container()
-    with messages:
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                with st.chat_message("user"):
-                    st.write(message["content"])
-    
-    # Chat input with styling
-    prompt = st.chat_input("Ask about trails...")
-    if prompt:
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
+    chat_panel()
 
 # Feature cards with enhanced styling
 st.markdown("<h2 style='color: black;'>🎯 Explore Our Features</h2>", unsafe_allow_html=True)
@@ -0,0 +1,132 @@
+"""Shared async client layer for OpenAI (v1 API) and Google Maps.
+
+One `AsyncOpenAI` client with a pooled HTTP connection set lives on a
+background event loop shared by the whole server process. Pages use the
+blocking facades (`chat`, `generate_image`, `geocode`) through the governor and
+call policy, and use `start` to launch independent calls at once and render
+each result as it completes.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+import googlemaps
+import httpx
+from openai import AsyncOpenAI
+
+from cache_backend import get_cache
+from call_policy import ENDPOINT_TIMEOUTS, attempt_time_left, on_attempt_cancel
+
+MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "50"))
+REQUEST_TIMEOUT_SECONDS = 180.0
+GEOCODE_TTL_SECONDS = 30 * 24 * 3600
+
+__all__ = ["as_completed", "chat", "generate_image", "geocode", "run", "start"]
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_openai: Optional[AsyncOpenAI] = None
+_maps: Optional[googlemaps.Client] = None
+_lock = threading.Lock()
+_fanout = ThreadPoolExecutor(max_workers=32, thread_name_prefix="fanout")
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-clients", daemon=True).start()
+        return _loop
+
+
+def run(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared loop and wait for its result.
+
+    Inside a `call_policy` attempt the coroutine is cancelled as soon as the
+    attempt times out or loses to its hedge, freeing the worker and connection.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _event_loop())
+    on_attempt_cancel(future.cancel)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def start(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Start a blocking call in the background and return its future."""
+    return _fanout.submit(fn, *args, **kwargs)
+
+
+def openai_client() -> AsyncOpenAI:
+    """The process-wide async OpenAI client (reads OPENAI_API_KEY / OPENAI_BASE_URL)."""
+    global _openai
+    with _lock:
+        if _openai is None:
+            _openai = AsyncOpenAI(
+                max_retries=0,  # retries are handled by call_policy
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                http_client=httpx.AsyncClient(limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS // 2,
+                )),
+            )
+        return _openai
+
+
+def maps_client() -> googlemaps.Client:
+    """The process-wide Google Maps client."""
+    global _maps
+    with _lock:
+        if _maps is None:
+            _maps = googlemaps.Client(
+                key=os.environ["GOOGLE_MAPS_API_KEY"],
+                # Bounds the worker thread a cancelled geocode leaves behind
+                timeout=ENDPOINT_TIMEOUTS["geocode"][2],
+                retry_timeout=ENDPOINT_TIMEOUTS["geocode"][2],
+                base_url=os.environ.get("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com"),
+            )
+        return _maps
+
+
+async def achat(**request: Any) -> str:
+    """Chat completion; returns the first choice's message text."""
+    completion = await openai_client().chat.completions.create(**request)
+    return completion.choices[0].message.content
+
+
+async def agenerate_image(**request: Any) -> List[str]:
+    """Image generation; returns the generated image URLs."""
+    images = await openai_client().images.generate(**request)
+    return [image.url for image in images.data]
+
+
+async def ageocode(address: str) -> list:
+    """Geocode an address without blocking the event loop."""
+    return await asyncio.to_thread(maps_client().geocode, address)
+
+
+def _with_attempt_timeout(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Give the OpenAI request the current attempt's time left as its own timeout."""
+    left = attempt_time_left()
+    if left is None or "timeout" in request:
+        return request
+    return {**request, "timeout": left}
+
+
+def chat(**request: Any) -> str:
+    """Blocking facade for `achat`."""
+    return run(achat(**_with_attempt_timeout(request)))
+
+
+def generate_image(**request: Any) -> List[str]:
+    """Blocking facade for `agenerate_image`."""
+    return run(agenerate_image(**_with_attempt_timeout(request)))
+
+
+def geocode(address: str) -> list:
+    """Blocking facade for `ageocode`, cached in the shared cache."""
+    return get_cache().get_or_set("geocode", address, lambda: run(ageocode(address)), ttl=GEOCODE_TTL_SECONDS)
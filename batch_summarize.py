@@ -0,0 +1,108 @@
+"""Precompute AI trail summaries for every park.
+
+Summarizes each row of the parks dataset with bounded concurrency and writes
+the results to the sidecar read by the Trail Finder (see `trail_summaries`).
+Rows whose summary is already stored for the same content hash are skipped,
+so an interrupted run resumes from its last checkpoint.
+
+    python batch_summarize.py --concurrency 8
+    python batch_summarize.py --stub --latency-ms 300   # against the local stand-in
+"""
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from parks_store import load_parks
+from stub_services import start_stub_server, stub_environment
+from trail_summaries import SummaryStore, generate_summary
+
+
+def summarize_parks(rows: List[Dict[str, Any]], store: SummaryStore, concurrency: int, retries: int,
+                    checkpoint_every: int, use_cache: bool = True) -> dict:
+    """Summarize `rows` into `store`; returns counts, timing and failures."""
+    pending = rows
+    failures: Dict[Any, str] = {}
+    served_by: Counter = Counter()
+    completed = 0
+    start = time.perf_counter()
+
+    def summarize(trail_data):
+        served = generate_summary(trail_data, hedge=False, use_cache=use_cache, interactive=False)
+        store.put(trail_data, served.result, served.model)
+        return served.model
+
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        failed = []
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = {pool.submit(summarize, row): row for row in pending}
+            for future in as_completed(futures):
+                row = futures[future]
+                try:
+                    served_by[future.result()] += 1
+                except Exception as e:
+                    failures[row["objectid"]] = str(e)
+                    failed.append(row)
+                    continue
+                failures.pop(row["objectid"], None)
+                completed += 1
+                if completed % checkpoint_every == 0:
+                    store.save()
+        store.save()
+        pending = failed
+        if pending and attempt < retries:
+            print(f"Retrying {len(pending)} failed park(s)...")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "summarized": completed,
+        "failed": failures,
+        "elapsed_s": elapsed,
+        "throughput_per_s": completed / elapsed if elapsed else 0.0,
+        "served_by": dict(served_by),
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Precompute AI summaries for every park.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Summaries in flight at once")
+    parser.add_argument("--retries", type=int, default=2, help="Extra passes over failed parks")
+    parser.add_argument("--checkpoint-every", type=int, default=10,
+                        help="Save the sidecar after this many new summaries")
+    parser.add_argument("--limit", type=int, default=None, help="Only summarize the first N parks")
+    parser.add_argument("--force", action="store_true", help="Regenerate summaries that are up to date")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible base URL (e.g. a local stand-in)")
+    parser.add_argument("--stub", action="store_true", help="Start the local OpenAI stand-in and use it")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Stand-in latency with --stub")
+    args = parser.parse_args(argv)
+
+    # The OpenAI client reads its configuration when it is first used
+    if args.stub:
+        _, stub_url = start_stub_server(latency_ms=args.latency_ms)
+        os.environ.update(stub_environment(stub_url))
+    elif args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+
+    parks = load_parks()
+    rows = parks.to_dict("records")[:args.limit]
+    store = SummaryStore()
+    todo = rows if args.force else [row for row in rows if store.lookup(row) is None]
+    print(f"{len(rows)} parks, {len(rows) - len(todo)} already summarized, {len(todo)} to do")
+
+    report = summarize_parks(todo, store, args.concurrency, args.retries, args.checkpoint_every,
+                             use_cache=not args.force)
+    print(f"Summarized {report['summarized']} park(s) in {report['elapsed_s']:.1f}s "
+          f"({report['throughput_per_s']:.2f}/s), {len(report['failed'])} failed")
+    if report["served_by"]:
+        print("Served by " + ", ".join(f"{model} x{count}" for model, count in report["served_by"].items()))
+    for objectid, error in report["failed"].items():
+        print(f"  OBJECTID {objectid}: {error}")
+    print(f"Summaries written to {store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Two-tier cache shared by every server process.
+
+A small in-memory LRU sits in front of a shared tier that all Streamlit
+workers on the host open: SQLite in WAL mode by default, so concurrent
+readers never block and one writer at a time appends to the log. Keys are
+namespaced and built from a canonical JSON encoding of the call's inputs, so
+every worker computes the same key for the same request. The shared tier is
+capped at `CACHE_MAX_BYTES` (least recently used entries go first) and keeps
+per-namespace hit/miss counters, so hit rates cover the whole fleet.
+
+Backends are picked with `CACHE_BACKEND` (`sqlite` or `memory`); register
+another in `BACKENDS` to plug in e.g. a key-value daemon.
+
+    python cache_backend.py stats
+    python cache_backend.py clear [namespace]
+"""
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.environ.get("CACHE_PATH", os.path.join("data", "cache.sqlite3"))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(256 * 2**20)))
+CACHE_MEMORY_ENTRIES = int(os.environ.get("CACHE_MEMORY_ENTRIES", "2048"))
+# Bounds how long a worker can serve an entry another worker replaced or evicted
+CACHE_MEMORY_TTL_SECONDS = float(os.environ.get("CACHE_MEMORY_TTL_SECONDS", "60"))
+KEY_VERSION = 1
+EVICT_EVERY_SETS = 50
+STATS_FLUSH_SECONDS = 2.0
+TOUCH_INTERVAL_SECONDS = 60.0
+
+_MISSING = object()
+
+
+def cache_key(namespace: str, request: Any) -> str:
+    """Stable key for `request` (any JSON-serializable value) within `namespace`."""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return f"{namespace}:v{KEY_VERSION}:{digest}"
+
+
+class MemoryCache:
+    """Per-process LRU with an expiry per entry."""
+
+    def __init__(self, max_entries: int = CACHE_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (ttl if ttl is not None else float("inf"))
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if namespace is None or k.startswith(f"{namespace}:")]:
+                del self._entries[key]
+
+
+class SQLiteCache:
+    """Shared tier: one SQLite file in WAL mode opened by every worker."""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._sets = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connection() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL,
+                expires_at REAL, accessed_at REAL NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            db.execute("""CREATE TABLE IF NOT EXISTS stats (
+                namespace TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0, sets INTEGER NOT NULL DEFAULT 0)""")
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get(self, key: str) -> Tuple[Any, Optional[float]]:
+        """Value and its expiry time, or `_MISSING`."""
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < now):
+            return _MISSING, None
+        # LRU bookkeeping is coarse so hot reads don't turn into writes
+        if now - row[2] > TOUCH_INTERVAL_SECONDS:
+            self._connection().execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        encoded = json.dumps(value)
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (key, namespace, value, size, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, key.split(":", 1)[0], encoded, len(encoded), now + ttl if ttl is not None else None, now))
+        with self._lock:
+            self._sets += 1
+            due = self._sets % EVICT_EVERY_SETS == 0
+        if due:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        if namespace is None:
+            self._connection().execute("DELETE FROM entries")
+        else:
+            self._connection().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until under `max_bytes`."""
+        db = self._connection()
+        removed = db.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?",
+                             (time.time(),)).rowcount
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            freed = 0
+            victims = []
+            for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if total - freed <= self.max_bytes:
+                    break
+                victims.append((key,))
+                freed += size
+            db.executemany("DELETE FROM entries WHERE key = ?", victims)
+            removed += len(victims)
+        return removed
+
+    def record(self, counts: Dict[str, Dict[str, int]]) -> None:
+        db = self._connection()
+        db.executemany(
+            "INSERT INTO stats (namespace, hits, misses, sets) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(namespace) DO UPDATE SET hits = hits + excluded.hits, "
+            "misses = misses + excluded.misses, sets = sets + excluded.sets",
+            [(ns, c["hits"], c["misses"], c["sets"]) for ns, c in counts.items()])
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        rows = self._connection().execute("SELECT namespace, hits, misses, sets FROM stats").fetchall()
+        entries = dict(self._connection().execute(
+            "SELECT namespace, COUNT(*) FROM entries GROUP BY namespace").fetchall())
+        return {ns: {"hits": hits, "misses": misses, "sets": sets, "entries": entries.get(ns, 0)}
+                for ns, hits, misses, sets in rows}
+
+
+class Cache:
+    """Memory tier in front of an optional shared tier, with hit/miss counters."""
+
+    def __init__(self, shared: Optional[SQLiteCache] = None, memory: Optional[MemoryCache] = None):
+        self.shared = shared
+        self.memory = memory or MemoryCache()
+        self._pending: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "sets": 0})
+        self._totals: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "sets": 0})
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _count(self, namespace: str, field: str) -> None:
+        with self._lock:
+            self._pending[namespace][field] += 1
+            self._totals[namespace][field] += 1
+            due = time.monotonic() - self._flushed_at >= STATS_FLUSH_SECONDS
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self) -> None:
+        """Add this process's counters to the shared ones (batched so hits don't all write)."""
+        if self.shared is None:
+            return
+        with self._lock:
+            pending, self._pending = dict(self._pending), defaultdict(lambda: {"hits": 0, "misses": 0, "sets": 0})
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            self.shared.record(pending)
+        except sqlite3.Error:
+            pass
+
+    def get(self, namespace: str, request: Any, default: Any = None) -> Any:
+        key = cache_key(namespace, request)
+        value = self.memory.get(key)
+        if value is _MISSING and self.shared is not None:
+            try:
+                value, expires_at = self.shared.get(key)
+            except sqlite3.Error:
+                value = _MISSING
+            if value is not _MISSING:
+                ttl = CACHE_MEMORY_TTL_SECONDS if expires_at is None \
+                    else min(CACHE_MEMORY_TTL_SECONDS, expires_at - time.time())
+                self.memory.set(key, value, ttl)
+        self._count(namespace, "misses" if value is _MISSING else "hits")
+        return default if value is _MISSING else value
+
+    def set(self, namespace: str, request: Any, value: Any, ttl: Optional[float] = None) -> None:
+        key = cache_key(namespace, request)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, ttl)
+            except sqlite3.Error:
+                pass
+        if self.shared is not None:
+            ttl = CACHE_MEMORY_TTL_SECONDS if ttl is None else min(ttl, CACHE_MEMORY_TTL_SECONDS)
+        self.memory.set(key, value, ttl)
+        self._count(namespace, "sets")
+
+    def delete(self, namespace: str, request: Any) -> None:
+        key = cache_key(namespace, request)
+        self.memory.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def get_or_set(self, namespace: str, request: Any, compute: Callable[[], Any],
+                   ttl: Optional[float] = None) -> Any:
+        """Cached value for `request`, computing and storing it on a miss. Errors aren't cached."""
+        value = self.get(namespace, request, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(namespace, request, value, ttl)
+        return value
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        self.memory.clear(namespace)
+        if self.shared is not None:
+            self.shared.clear(namespace)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit rates per namespace: fleet-wide from the shared tier, else this process only."""
+        if self.shared is not None:
+            try:
+                counts = self.shared.stats()
+            except sqlite3.Error:
+                counts = {ns: dict(c) for ns, c in self._totals.items()}
+        else:
+            counts = {ns: dict(c) for ns, c in self._totals.items()}
+        for c in counts.values():
+            lookups = c["hits"] + c["misses"]
+            c["hit_rate"] = c["hits"] / lookups if lookups else None
+        return counts
+
+
+BACKENDS: Dict[str, Callable[[], Cache]] = {
+    "memory": lambda: Cache(),
+    "sqlite": lambda: Cache(SQLiteCache()),
+}
+
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    """The process-wide cache for the configured backend."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = BACKENDS[CACHE_BACKEND]()
+            atexit.register(_cache.flush_stats)
+        return _cache
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "clear":
+        get_cache().clear(sys.argv[2] if len(sys.argv) > 2 else None)
+        print("Cleared", sys.argv[2] if len(sys.argv) > 2 else "all namespaces")
+    else:
+        for namespace, c in sorted(get_cache().stats().items()):
+            rate = f"{c['hit_rate']:.1%}" if c["hit_rate"] is not None else "-"
+            print(f"{namespace:<16} hits {c['hits']:>7}  misses {c['misses']:>7}  hit rate {rate:>6}  "
+                  f"entries {c.get('entries', '-')}")
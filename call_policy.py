@@ -0,0 +1,239 @@
+"""Adaptive timeouts, jittered retries and hedging for external calls.
+
+Every endpoint (trail summary, hiking info, image analysis, geocoding, image
+download, ...) keeps a window of recent latencies. Timeouts are derived from
+the observed p99 instead of being unbounded, failed attempts are retried with
+full-jitter exponential backoff, and hedged endpoints fire one duplicate
+request once the p95 has passed without an answer, taking whichever finishes
+first. Only the slow tail pays for the duplicate.
+
+Endpoints may carry a variant suffix (`hiking_info@gpt-4o-mini`): each variant
+gets its own latency window but shares the base endpoint's timeout bounds.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+TIMEOUT_MULTIPLIER = 3.0
+RETRY_BASE_SECONDS = float(os.environ.get("RETRY_BASE_SECONDS", "0.5"))
+
+# (initial timeout, floor, ceiling) in seconds, used until enough samples exist
+ENDPOINT_TIMEOUTS: Dict[str, Tuple[float, float, float]] = {
+    "default": (30.0, 2.0, 60.0),
+    "trail_summary": (45.0, 5.0, 90.0),
+    "hiking_info": (60.0, 5.0, 120.0),
+    "image_analysis": (45.0, 5.0, 90.0),
+    "image_generation": (90.0, 10.0, 180.0),
+    "geocode": (10.0, 1.0, 20.0),
+    "download_image": (20.0, 2.0, 60.0),
+}
+
+_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="call")
+_current = threading.local()
+
+
+class CallTimeout(Exception):
+    """Raised when every attempt at an endpoint timed out."""
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies for one endpoint."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency at `pct` over the window, or None while there are too few samples."""
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def tracker(endpoint: str) -> LatencyTracker:
+    """The process-wide latency tracker for `endpoint`."""
+    with _trackers_lock:
+        if endpoint not in _trackers:
+            _trackers[endpoint] = LatencyTracker()
+        return _trackers[endpoint]
+
+
+def _bounds(endpoint: str) -> Tuple[float, float, float]:
+    base = endpoint.split("@", 1)[0]
+    return ENDPOINT_TIMEOUTS.get(base, ENDPOINT_TIMEOUTS["default"])
+
+
+def adaptive_timeout(endpoint: str) -> float:
+    """Timeout for the next call: a multiple of the observed p99, within the endpoint's bounds."""
+    initial, floor, ceiling = _bounds(endpoint)
+    p99 = tracker(endpoint).percentile(99)
+    if p99 is None:
+        return initial
+    return min(ceiling, max(floor, p99 * TIMEOUT_MULTIPLIER))
+
+
+def _timed(fn: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class _Running:
+    """One attempt in the pool; its deadline starts when a worker picks it up, not at submit."""
+
+    def __init__(self, fn: Callable[..., Any], args: tuple, kwargs: dict, timeout: float):
+        self.timeout = timeout
+        self.submitted = time.monotonic()
+        self.started: Optional[float] = None
+        self._cancelled = False
+        self._on_cancel: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+        self.future = _executor.submit(self._run, fn, args, kwargs)
+
+    def _run(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[Any, float]:
+        self.started = time.monotonic()
+        _current.attempt = self
+        try:
+            return _timed(fn, args, kwargs)
+        finally:
+            _current.attempt = None
+
+    def deadline(self) -> float:
+        # A queued attempt may wait up to one more timeout for a free worker
+        if self.started is None:
+            return self.submitted + 2 * self.timeout
+        return self.started + self.timeout
+
+    def time_left(self) -> float:
+        return max(0.0, self.deadline() - time.monotonic())
+
+    def on_cancel(self, callback: Callable[[], Any]) -> None:
+        with self._lock:
+            if not self._cancelled:
+                self._on_cancel.append(callback)
+                return
+        callback()
+
+    def cancel(self) -> None:
+        self.future.cancel()
+        with self._lock:
+            self._cancelled = True
+            callbacks, self._on_cancel = self._on_cancel, []
+        for callback in callbacks:
+            callback()
+
+
+def attempt_time_left() -> Optional[float]:
+    """Seconds left for the attempt running on this thread, or None outside `resilient_call`."""
+    attempt = getattr(_current, "attempt", None)
+    return None if attempt is None else attempt.time_left()
+
+
+def on_attempt_cancel(callback: Callable[[], Any]) -> None:
+    """Run `callback` when the attempt on this thread is abandoned (timed out or beaten by its hedge)."""
+    attempt = getattr(_current, "attempt", None)
+    if attempt is not None:
+        attempt.on_cancel(callback)
+
+
+def _attempt(endpoint: str, fn: Callable[..., Any], args: tuple, kwargs: dict, hedge: bool,
+             before_attempt: Optional[Callable[[], None]], before_hedge: Optional[Callable[[], bool]],
+             deadline: Optional[float]) -> Any:
+    stats = tracker(endpoint)
+    if before_attempt is not None:
+        before_attempt()
+    timeout = full_timeout = adaptive_timeout(endpoint)
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            raise CallTimeout(f"{endpoint} had no time left in its budget")
+    attempts = [_Running(fn, args, kwargs, timeout)]
+    hedge_after = stats.percentile(95) if hedge else None
+    if hedge_after is not None and hedge_after >= timeout:
+        hedge_after = None
+
+    try:
+        while True:
+            finished = [a.future for a in attempts if a.future.done()]
+            running = [a for a in attempts if not a.future.done()]
+            if not running or any(f.exception() is None for f in finished):
+                break
+            now = time.monotonic()
+            wake = max(a.deadline() for a in running)
+            if deadline is not None:
+                wake = min(wake, deadline)
+            if now >= wake:
+                break
+            # Look again once a queued attempt would have timed out, to pick up when it started
+            queued = [a.submitted + a.timeout for a in running if a.started is None]
+            wake = min([wake] + [t for t in queued if t > now])
+            if hedge_after is not None:
+                first = attempts[0]
+                hedge_at = first.started + hedge_after if first.started is not None else now + hedge_after
+                if now >= hedge_at:
+                    hedge_after = None
+                    # The hedge only gets what is left of the caller's budget
+                    hedge_timeout = timeout if deadline is None else min(timeout, deadline - now)
+                    # Never wait for a hedge slot: the first request may answer meanwhile
+                    if hedge_timeout > 0 and (before_hedge is None or before_hedge()):
+                        attempts.append(_Running(fn, args, kwargs, hedge_timeout))
+                    continue
+                wake = min(wake, hedge_at)
+            wait([a.future for a in running], timeout=wake - now, return_when=FIRST_COMPLETED)
+
+        # A response that arrived by the deadline counts, whenever we got around to looking
+        error: Optional[BaseException] = None
+        for attempt in attempts:
+            if attempt.future.done():
+                if attempt.future.exception() is None:
+                    result, seconds = attempt.future.result()
+                    stats.record(seconds)
+                    return result
+                error = attempt.future.exception()
+        if error is not None and all(a.future.done() for a in attempts):
+            raise error
+    finally:
+        # Cancel whatever is still queued or in flight so it frees its worker and connection
+        for attempt in attempts:
+            attempt.cancel()
+    # A call cut short by the caller's budget would have taken longer than we know: count it at the ceiling
+    stats.record(timeout if timeout >= full_timeout else _bounds(endpoint)[2])
+    raise CallTimeout(f"{endpoint} did not respond within {timeout:.1f}s")
+
+
+def resilient_call(endpoint: str, fn: Callable[..., Any], *args: Any, retries: int = 2,
+                   hedge: bool = False, before_attempt: Optional[Callable[[], None]] = None,
+                   before_hedge: Optional[Callable[[], bool]] = None, deadline: Optional[float] = None,
+                   **kwargs: Any) -> Any:
+    """Call `fn(*args, **kwargs)` with an adaptive timeout, jittered retries and optional hedging.
+
+    `before_attempt` runs ahead of every attempt, outside the timed section;
+    the OpenAI governor uses it to take a rate-limit token. `before_hedge`
+    must not block: it returns False to skip the hedge (no token free right
+    now). `deadline` (a `time.monotonic()` value) bounds the whole call,
+    retries and backoff included, for callers with a latency budget.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return _attempt(endpoint, fn, args, kwargs, hedge, before_attempt, before_hedge, deadline)
+        except Exception:
+            backoff = random.uniform(0, RETRY_BASE_SECONDS * 2 ** attempt)
+            if attempt == retries or (deadline is not None and time.monotonic() + backoff >= deadline):
+                raise
+            time.sleep(backoff)
@@ -0,0 +1,95 @@
+"""Offline city and ZIP centroids for parks the geocoder can't place.
+
+`gazetteer.csv` bundles approximate centroids for every Santa Clara County
+city and ZIP (plus neighbours that appear in Parks.csv, such as Watsonville)
+and the county itself. Lookups are plain dict hits: parks without a street
+address are placed from their ZIP, city or name without any network call,
+and a failed or timed-out geocode falls back to the same centroids instead of
+a fixed point in another city.
+"""
+import csv
+import os
+import re
+import threading
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import pandas as pd
+
+GAZETTEER_FILE = os.environ.get("GAZETTEER_FILE", "gazetteer.csv")
+
+Point = Tuple[float, float]
+
+
+def _present(value: Any) -> bool:
+    return not pd.isna(value) and str(value).strip() != ""
+
+
+def _name_key(name: Any) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split())
+
+
+def _zip_key(zip_code: Any) -> str:
+    """First five digits of a ZIP (`95035-5439` -> `95035`)."""
+    return str(zip_code).strip()[:5]
+
+
+class Gazetteer:
+    """In-memory centroid lookup by ZIP, city name and county."""
+
+    def __init__(self, cities: Dict[str, Point], zips: Dict[str, Point], county: Point, county_name: str):
+        self.cities = cities
+        self.zips = zips
+        self.county = county
+        self.county_name = county_name
+
+    @classmethod
+    def from_file(cls, path: str = GAZETTEER_FILE) -> "Gazetteer":
+        cities: Dict[str, Point] = {}
+        zips: Dict[str, Point] = {}
+        county, county_name = None, ""
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                point = (float(row["lat"]), float(row["lng"]))
+                if row["kind"] == "zip":
+                    zips[_zip_key(row["name"])] = point
+                elif row["kind"] == "city":
+                    cities[_name_key(row["name"])] = point
+                elif row["kind"] == "county":
+                    county, county_name = point, row["name"]
+        if county is None:
+            raise ValueError(f"{path} has no county row")
+        return cls(cities, zips, county, county_name)
+
+    def locate(self, park: Mapping[str, Any]) -> Tuple[float, float, str]:
+        """Best centroid for a park: its ZIP, then its city, then a place its name starts with, then the county.
+
+        Returns (lat, lng, description of what the point is the center of).
+        """
+        zip_code = park.get("zip_code")
+        if _present(zip_code) and _zip_key(zip_code) in self.zips:
+            return (*self.zips[_zip_key(zip_code)], f"ZIP {_zip_key(zip_code)}")
+        city = park.get("city")
+        if _present(city) and _name_key(city) in self.cities:
+            return (*self.cities[_name_key(city)], str(city))
+        name = park.get("park_name")
+        if _present(name):
+            # "New Almaden", "Sunnyvale Baylands": the longest leading words that name a place
+            words = _name_key(name).split()
+            for end in range(len(words), 0, -1):
+                place = " ".join(words[:end])
+                if place in self.cities:
+                    return (*self.cities[place], place.title())
+        return (*self.county, self.county_name)
+
+
+_gazetteer: Optional[Gazetteer] = None
+_lock = threading.Lock()
+
+
+def get_gazetteer(path: str = GAZETTEER_FILE) -> Gazetteer:
+    """Process-wide gazetteer, loaded on first use."""
+    global _gazetteer
+    with _lock:
+        if _gazetteer is None:
+            _gazetteer = Gazetteer.from_file(path)
+        return _gazetteer
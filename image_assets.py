@@ -0,0 +1,133 @@
+"""Generated image store with display-size derivatives and a disk cap.
+
+DALL-E returns 1024x1024 PNGs, far larger than the column they are shown in.
+Originals are kept under `IMAGE_DIR` next to WebP derivatives at a few display
+widths; pages ask for the smallest asset that covers the width they render
+at. The directory is capped at `IMAGE_CACHE_MAX_BYTES`, evicting the least
+recently used files (originals and derivatives alike) first.
+"""
+import os
+import tempfile
+import threading
+from typing import Optional, Sequence
+
+from PIL import Image
+
+IMAGE_DIR = os.environ.get("GENERATED_IMAGE_DIR", "generated_images")
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", str(200 * 2**20)))
+DISPLAY_WIDTHS: Sequence[int] = (256, 512, 768)
+DEFAULT_DISPLAY_WIDTH = 768
+WEBP_QUALITY = 80
+
+_lock = threading.Lock()
+
+
+def original_path(filename: str) -> str:
+    """Where an original generated image is stored."""
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    return os.path.join(IMAGE_DIR, filename)
+
+
+def _publish(path: str, write) -> None:
+    """Call `write(tmp_path)` on a private temp file next to `path`, then move it into place.
+
+    Other sessions only ever see a missing or a complete file.
+    """
+    directory = os.path.dirname(path) or "."
+    stem, suffix = os.path.splitext(os.path.basename(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{stem}.", suffix=suffix)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def store_original(path: str, data: bytes) -> None:
+    """Atomically write a downloaded original."""
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+    _publish(path, write)
+
+
+def _derivative_path(path: str, width: int) -> str:
+    stem, _ = os.path.splitext(path)
+    return f"{stem}_w{width}.webp"
+
+
+def _touch(path: str) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def make_derivative(path: str, width: int, replace: bool = False) -> str:
+    """Write a WebP copy of `path` scaled down to `width` (never up) and return its path."""
+    target = _derivative_path(path, width)
+    if os.path.exists(target) and not replace:
+        return target
+    with Image.open(path) as image:
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        _publish(target, lambda tmp_path: image.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=4))
+    return target
+
+
+def register(path: str) -> None:
+    """Build the display derivatives for a new original and enforce the disk cap."""
+    for width in DISPLAY_WIDTHS:
+        # A regenerated original replaces the derivatives of the one it overwrote
+        make_derivative(path, width, replace=True)
+    enforce_cap()
+
+
+def display_asset(path: str, width: int = DEFAULT_DISPLAY_WIDTH) -> Optional[str]:
+    """Smallest stored asset that covers `width`, or None if the image was evicted."""
+    candidates = [w for w in DISPLAY_WIDTHS if w >= width] or [max(DISPLAY_WIDTHS)]
+    for candidate in sorted(candidates):
+        derivative = _derivative_path(path, candidate)
+        if os.path.exists(derivative):
+            _touch(derivative)
+            return derivative
+    if os.path.exists(path):
+        _touch(path)
+        return make_derivative(path, min(candidates))
+    # Original evicted: fall back to whatever derivative is left
+    for candidate in sorted(DISPLAY_WIDTHS, reverse=True):
+        derivative = _derivative_path(path, candidate)
+        if os.path.exists(derivative):
+            _touch(derivative)
+            return derivative
+    return None
+
+
+def enforce_cap(max_bytes: int = IMAGE_CACHE_MAX_BYTES) -> int:
+    """Evict least recently used files until `IMAGE_DIR` fits in `max_bytes`. Returns bytes freed."""
+    with _lock:
+        if not os.path.isdir(IMAGE_DIR):
+            return 0
+        files = []
+        for name in os.listdir(IMAGE_DIR):
+            path = os.path.join(IMAGE_DIR, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        freed = 0
+        for _, size, path in sorted(files):
+            if total - freed <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                freed += size
+            except OSError:
+                continue
+        return freed
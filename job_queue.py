@@ -0,0 +1,110 @@
+"""Process-wide background job queue for slow OpenAI work.
+
+Illustration generation and photo analysis take a full API round-trip (plus a
+download for images). Running them on a shared thread pool keeps Streamlit's
+script threads free: a page submits a job, keeps the returned job id in
+`st.session_state` and polls for the result, even after navigating away and
+back.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "8"))
+JOB_PER_USER_LIMIT = int(os.environ.get("JOB_PER_USER_LIMIT", "2"))
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobLimitError(Exception):
+    """Raised when a user already has the maximum number of active jobs."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    user_id: str
+    kind: str
+    status: str = QUEUED
+    result: Any = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds spent running (so far, if still running)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobQueue:
+    """Thread-pool job runner with a per-user cap on active jobs."""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, per_user_limit: int = JOB_PER_USER_LIMIT,
+                 retention: int = JOB_RETENTION_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._per_user_limit = per_user_limit
+        self._retention = retention
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: str, kind: str, fn: Callable[..., Any], *args, **kwargs) -> str:
+        """Queue `fn(*args, **kwargs)` for `user_id` and return the new job id."""
+        with self._lock:
+            self._prune()
+            active = sum(1 for job in self._jobs.values() if job.user_id == user_id and job.active)
+            if active >= self._per_user_limit:
+                raise JobLimitError(
+                    f"You already have {active} job(s) running. Please wait for one to finish.")
+            job = Job(job_id=uuid.uuid4().hex, user_id=user_id, kind=kind)
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.job_id
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict):
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        cutoff = time.time() - self._retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if not job.active and (job.finished_at or 0) < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job; None once it has expired from the queue."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """The job queue shared by every session in this server process."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
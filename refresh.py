@@ -0,0 +1,104 @@
+"""Incremental refresh after Parks.csv is re-exported.
+
+Diffs the new export against the store by OBJECTID and row hash (see
+`parks_store.write_store`), rewrites only the partitions that changed, and
+then touches derived data for the changed parks alone:
+
+- precomputed summaries and cached on-demand summaries of changed or removed
+  parks are dropped (and regenerated with `--summaries`),
+- geocodes of the old addresses of changed or removed parks are dropped (and
+  new addresses are geocoded ahead of time with `--geocode`).
+
+The recommender and page caches key on the store version, so they pick the
+new data up on their own.
+
+    python refresh.py [Parks.csv] [data/parks] [--summaries] [--geocode]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from async_clients import geocode
+from batch_summarize import summarize_parks
+from cache_backend import get_cache
+from parks_store import PARKS_CSV, PARKS_STORE, StoreDiff, park_address, read_parks_csv, write_store
+from trail_summaries import SummaryStore, row_hash
+
+
+def drop_derived(diff: StoreDiff, fresh: List[Dict[str, Any]], store: SummaryStore) -> dict:
+    """Forget summaries and geocodes derived from rows that changed or were removed.
+
+    A geocode is kept if a new or changed park still uses the address; one that
+    an unchanged park shares is dropped too and simply fetched again on use.
+    """
+    cache = get_cache()
+    for objectid in diff.changed + diff.removed:
+        store.remove(objectid)
+    store.save()
+    summaries = geocodes = 0
+    if diff.previous.empty:
+        return {"summaries": summaries, "geocodes": geocodes}
+    current_addresses = {park_address(row) for row in fresh}
+    for old in diff.previous.to_dict("records"):
+        cache.delete("trail_summary", {"hash": row_hash(old)})
+        summaries += 1
+        address = park_address(old)
+        if address is not None and address not in current_addresses:
+            cache.delete("geocode", address)
+            geocodes += 1
+    return {"summaries": summaries, "geocodes": geocodes}
+
+
+def refresh(csv_path: str = PARKS_CSV, store_dir: str = PARKS_STORE, summaries: bool = False,
+            geocodes: bool = False, concurrency: int = 8) -> dict:
+    """Bring the store and its derived data up to date with `csv_path`."""
+    start = time.perf_counter()
+    parks = read_parks_csv(csv_path)
+    diff = write_store(parks, store_dir)
+    report = {
+        "added": len(diff.added),
+        "changed": len(diff.changed),
+        "removed": len(diff.removed),
+        "unchanged": diff.unchanged,
+        "partitions_rewritten": len(diff.partitions),
+    }
+    fresh = parks[parks["objectid"].isin(diff.added + diff.changed)].to_dict("records")
+    store = SummaryStore()
+    report["dropped"] = drop_derived(diff, fresh, store)
+
+    if summaries and fresh:
+        result = summarize_parks(fresh, store, concurrency, retries=2, checkpoint_every=10)
+        report["summarized"], report["summary_failures"] = result["summarized"], len(result["failed"])
+    if geocodes and fresh:
+        addresses = {address for address in map(park_address, fresh) if address is not None}
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda address: bool(geocode(address)), addresses))
+        report["geocoded"] = sum(results)
+    report["elapsed_s"] = time.perf_counter() - start
+    return report
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Incrementally refresh the parks store and derived data.")
+    parser.add_argument("csv", nargs="?", default=PARKS_CSV)
+    parser.add_argument("store", nargs="?", default=PARKS_STORE)
+    parser.add_argument("--summaries", action="store_true", help="Regenerate summaries of new and changed parks")
+    parser.add_argument("--geocode", action="store_true", help="Geocode addresses of new and changed parks")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    report = refresh(args.csv, args.store, args.summaries, args.geocode, args.concurrency)
+    print(f"{report['added']} added, {report['changed']} changed, {report['removed']} removed, "
+          f"{report['unchanged']} unchanged; {report['partitions_rewritten']} partition(s) rewritten")
+    print(f"Dropped {report['dropped']['summaries']} cached summaries and "
+          f"{report['dropped']['geocodes']} geocodes of changed or removed parks")
+    if "summarized" in report:
+        print(f"Summarized {report['summarized']} park(s), {report['summary_failures']} failed")
+    if "geocoded" in report:
+        print(f"Geocoded {report['geocoded']} address(es)")
+    print(f"Done in {report['elapsed_s']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Bounded session state with spill-to-disk for chat history and binary blobs.
+
+Only the most recent chat messages stay in `st.session_state`; older ones are
+appended to a per-session JSON-lines file and read back when the user asks to
+see them. Large binary payloads (uploaded photos, generated images) are kept
+on disk under the same session directory and referenced by key.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import streamlit as st
+
+STORE_DIR = os.environ.get("SESSION_STORE_DIR", ".session_store")
+CHAT_HISTORY_LIMIT = int(os.environ.get("CHAT_HISTORY_LIMIT", "40"))
+CHAT_RENDER_WINDOW = int(os.environ.get("CHAT_RENDER_WINDOW", "10"))
+SESSION_MAX_AGE_SECONDS = int(os.environ.get("SESSION_MAX_AGE_SECONDS", str(24 * 3600)))
+
+
+def session_id() -> str:
+    """Stable id for the current browser session."""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+        prune_store()
+    return st.session_state.session_id
+
+
+def _session_dir() -> str:
+    path = os.path.join(STORE_DIR, session_id())
+    os.makedirs(path, exist_ok=True)
+    os.utime(path)
+    return path
+
+
+def _history_path() -> str:
+    return os.path.join(_session_dir(), "chat_history.jsonl")
+
+
+def prune_store(max_age: int = SESSION_MAX_AGE_SECONDS) -> None:
+    """Delete spilled data of sessions that have been idle longer than `max_age`."""
+    if not os.path.isdir(STORE_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(STORE_DIR):
+        path = os.path.join(STORE_DIR, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def _init_chat_state() -> None:
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = []
+    if "chat_spilled" not in st.session_state:
+        st.session_state.chat_spilled = 0
+
+
+def append_chat_message(message: Dict[str, str]) -> None:
+    """Add a message to the chat history, spilling the oldest ones past the cap."""
+    _init_chat_state()
+    history = st.session_state.chat_history
+    history.append(message)
+    overflow = len(history) - CHAT_HISTORY_LIMIT
+    if overflow > 0:
+        with open(_history_path(), "a", encoding="utf-8") as f:
+            for old in history[:overflow]:
+                f.write(json.dumps(old) + "\n")
+        del history[:overflow]
+        st.session_state.chat_spilled += overflow
+
+
+def load_spilled_history() -> List[Dict[str, str]]:
+    """Read the chat messages that were spilled to disk for this session."""
+    _init_chat_state()
+    if not st.session_state.chat_spilled or not os.path.exists(_history_path()):
+        return []
+    with open(_history_path(), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _render_messages(messages: List[Dict[str, str]]) -> None:
+    for message in messages:
+        if message["role"] == "user":
+            with st.chat_message("user"):
+                st.write(message["content"])
+
+
+def render_chat_history(window: int = CHAT_RENDER_WINDOW) -> None:
+    """Render the most recent chat messages; older ones are loaded on demand."""
+    _init_chat_state()
+    history = st.session_state.chat_history
+    older_in_memory = max(0, len(history) - window)
+    older_total = older_in_memory + st.session_state.chat_spilled
+    if older_total:
+        with st.expander(f"Earlier messages ({older_total})"):
+            if st.button("Load earlier messages", key="load_earlier_messages"):
+                _render_messages(load_spilled_history() + history[:older_in_memory])
+    _render_messages(history[older_in_memory:])
+
+
+@st.fragment
+def chat_panel() -> None:
+    """Sidebar chat; sending a message reruns only this fragment, not the page."""
+    # Chat container (only the most recent messages are rendered)
+    messages = st.container()
+
+    # Chat input with styling
+    prompt = st.chat_input("Ask about trails...")
+    if prompt:
+        append_chat_message({"role": "user", "content": prompt})
+    with messages:
+        render_chat_history()
+
+
+def put_blob(data: bytes, suffix: str = "") -> str:
+    """Write a binary payload to this session's store and return its key."""
+    key = hashlib.sha256(data).hexdigest()[:32] + suffix
+    path = os.path.join(_session_dir(), "blobs", key)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    return key
+
+
+def blob_path(key: str) -> Optional[str]:
+    """Path of a stored blob, or None if it has been pruned."""
+    path = os.path.join(_session_dir(), "blobs", key)
+    return path if os.path.exists(path) else None
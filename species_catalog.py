@@ -0,0 +1,155 @@
+"""Indexed species catalog with autocomplete, fuzzy matching and cached facts.
+
+Species are loaded from `species.json` ({category: {subcategory: [names]}}).
+The catalog keeps a sorted prefix index over every word suffix of each name
+("great blue heron", "blue heron", "heron") for instant autocomplete, and a
+trigram index for typo-tolerant matching, so "Salmonbery" resolves to the
+same species (and the same cached facts and illustration) as "Salmonberry".
+"""
+import json
+import os
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from async_clients import chat
+from cache_backend import get_cache
+from model_router import routed
+
+SPECIES_FILE = os.environ.get("SPECIES_FILE", "species.json")
+FUZZY_MIN_SCORE = 0.3
+RESOLVE_MIN_SCORE = 0.5
+
+
+@dataclass(frozen=True)
+class Species:
+    name: str
+    category: str
+    subcategory: str
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SpeciesCatalog:
+    """In-memory catalog with prefix and trigram indexes."""
+
+    def __init__(self, species: List[Species]):
+        self.species = species
+        self._by_name: Dict[str, int] = {normalize(s.name): i for i, s in enumerate(species)}
+        self._grams: List[Set[str]] = [trigrams(s.name) for s in species]
+        prefix_keys: List[Tuple[str, int]] = []
+        trigram_index: Dict[str, Set[int]] = defaultdict(set)
+        for i, s in enumerate(species):
+            words = normalize(s.name).split()
+            prefix_keys.extend((" ".join(words[start:]), i) for start in range(len(words)))
+            for gram in self._grams[i]:
+                trigram_index[gram].add(i)
+        self._prefix_keys = sorted(prefix_keys)
+        self._trigram_index = dict(trigram_index)
+
+    @classmethod
+    def from_file(cls, path: str = SPECIES_FILE) -> "SpeciesCatalog":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls([Species(name, category, subcategory)
+                    for category, groups in data.items()
+                    for subcategory, names in groups.items()
+                    for name in names])
+
+    def categories(self) -> List[str]:
+        return list(dict.fromkeys(s.category for s in self.species))
+
+    def subcategories(self, category: str) -> List[str]:
+        return list(dict.fromkeys(s.subcategory for s in self.species if s.category == category))
+
+    def species_in(self, category: str, subcategory: Optional[str] = None) -> List[Species]:
+        return [s for s in self.species
+                if s.category == category and (subcategory is None or s.subcategory == subcategory)]
+
+    def _prefix_matches(self, query: str) -> List[int]:
+        matches: Dict[int, None] = {}
+        position = bisect_left(self._prefix_keys, (query, -1))
+        while position < len(self._prefix_keys) and self._prefix_keys[position][0].startswith(query):
+            matches[self._prefix_keys[position][1]] = None
+            position += 1
+        # Names that start with the query rank ahead of later-word matches
+        return sorted(matches, key=lambda i: (not normalize(self.species[i].name).startswith(query),
+                                              self.species[i].name))
+
+    def _fuzzy_matches(self, query: str) -> List[Tuple[float, int]]:
+        grams = trigrams(query)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for i in self._trigram_index.get(gram, ()):
+                shared[i] += 1
+        scored = [(count / (len(grams) + len(self._grams[i]) - count), i) for i, count in shared.items()]
+        return sorted(((score, i) for score, i in scored if score >= FUZZY_MIN_SCORE), reverse=True)
+
+    def search(self, query: str, limit: int = 10, category: Optional[str] = None) -> List[Species]:
+        """Autocomplete: prefix matches first, then typo-tolerant trigram matches."""
+        query = normalize(query)
+        if not query:
+            return []
+        ranked = self._prefix_matches(query)
+        if len(ranked) < limit:
+            seen = set(ranked)
+            ranked += [i for _, i in self._fuzzy_matches(query) if i not in seen]
+        results = [self.species[i] for i in ranked
+                   if category is None or self.species[i].category == category]
+        return results[:limit]
+
+    def resolve(self, text: str) -> Optional[Species]:
+        """Canonical species for free text (exact or close misspelling), if any."""
+        query = normalize(text)
+        if query in self._by_name:
+            return self.species[self._by_name[query]]
+        fuzzy = self._fuzzy_matches(query)
+        if fuzzy and fuzzy[0][0] >= RESOLVE_MIN_SCORE:
+            return self.species[fuzzy[0][1]]
+        return None
+
+
+_catalog: Optional[SpeciesCatalog] = None
+_catalog_mtime: Optional[float] = None
+_lock = threading.Lock()
+
+
+def get_catalog(path: str = SPECIES_FILE) -> SpeciesCatalog:
+    """Process-wide catalog, rebuilt when the data file changes."""
+    global _catalog, _catalog_mtime
+    with _lock:
+        mtime = os.path.getmtime(path)
+        if _catalog is None or mtime != _catalog_mtime:
+            _catalog, _catalog_mtime = SpeciesCatalog.from_file(path), mtime
+        return _catalog
+
+
+def cached_facts(species: Species) -> Optional[str]:
+    """Facts for a species if they have been generated before."""
+    return get_cache().get("species_facts", normalize(species.name))
+
+
+def species_facts(species: Species) -> str:
+    """Short field-guide facts for a species, generated once and kept in the shared cache."""
+    return get_cache().get_or_set("species_facts", normalize(species.name), lambda: routed(
+        "species_facts",
+        chat,
+        hedge=True,
+        messages=[{
+            "role": "user",
+            "content": f"Give 4 short field-guide facts about the {species.name} ({species.subcategory.lower()}) "
+                       "as found along Pacific Northwest and Northern California creek trails. "
+                       "Format as a Markdown bullet list."
+        }]
+    ).result)
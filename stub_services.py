@@ -0,0 +1,159 @@
+"""Local stand-ins for the OpenAI and Google Maps APIs.
+
+Serves just enough of both HTTP APIs for the pages to run end to end without
+network access or API keys. Point the clients at it with:
+
+    OPENAI_API_BASE / OPENAI_BASE_URL = http://127.0.0.1:<port>/v1
+    GOOGLE_MAPS_BASE_URL              = http://127.0.0.1:<port>
+
+Run standalone with `python stub_services.py --port 8765 --latency-ms 300`.
+"""
+import argparse
+import json
+import random
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+def _png_bytes(size: int = 64) -> bytes:
+    """Build a small solid-green PNG so image downloads have real content."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    row = b"\x00" + b"\x4c\xaf\x50" * size
+    raw = zlib.compress(row * size)
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", raw) + chunk(b"IEND", b"")
+
+
+STUB_PNG = _png_bytes()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers chat, image, geocode and image-download requests."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self):
+        latency = self.server.latency_ms / 1000.0
+        if latency:
+            time.sleep(random.uniform(0.5 * latency, 1.5 * latency))
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, payload: dict, status: int = 200):
+        self._send(status, json.dumps(payload).encode("utf-8"))
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_POST(self):
+        payload = self._read_json()
+        self._delay()
+        with self.server.lock:
+            self.server.request_count += 1
+        if self.path.endswith("/chat/completions"):
+            model = payload.get("model", "stub-model")
+            content = f"**Stub response** from `{model}` for {len(payload.get('messages', []))} message(s)."
+            self._send_json({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        elif self.path.endswith("/images/generations"):
+            host, port = self.server.server_address[:2]
+            count = int(payload.get("n", 1))
+            self._send_json({
+                "created": int(time.time()),
+                "data": [{"url": f"http://{host}:{port}/images/stub_{i}.png"} for i in range(count)],
+            })
+        else:
+            self._send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+    def do_GET(self):
+        if self.path.startswith("/images/"):
+            self._send(200, STUB_PNG, content_type="image/png")
+            return
+        self._delay()
+        with self.server.lock:
+            self.server.request_count += 1
+        if self.path.startswith("/maps/api/geocode/json"):
+            self._send_json({
+                "status": "OK",
+                "results": [{"geometry": {"location": {
+                    "lat": 37.3 + random.uniform(-0.1, 0.1),
+                    "lng": -121.9 + random.uniform(-0.1, 0.1),
+                }}}],
+            })
+        else:
+            self._send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0,
+                      latency_ms: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stand-in server on a daemon thread and return it with its base URL."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.latency_ms = latency_ms
+    server.request_count = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}"
+
+
+def stub_environment(base_url: str) -> dict:
+    """Environment variables that point every client at the stand-in server."""
+    return {
+        "OPENAI_API_KEY": "sk-stub",
+        "OPENAI_API_BASE": f"{base_url}/v1",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "GOOGLE_MAPS_API_KEY": "AIzaStubKey",
+        "GOOGLE_MAPS_BASE_URL": base_url,
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Run local OpenAI/Google Maps stand-ins.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Mean simulated upstream latency per request")
+    args = parser.parse_args(argv)
+
+    server, base_url = start_stub_server(args.host, args.port, args.latency_ms)
+    print(f"Stub services listening on {base_url}")
+    for name, value in stub_environment(base_url).items():
+        print(f"export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
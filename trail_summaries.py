@@ -0,0 +1,171 @@
+"""AI trail summaries and their precomputed sidecar store.
+
+Summaries are keyed by park OBJECTID together with a hash of the park's row,
+so a summary is only reused while the data it was generated from is
+unchanged. `batch_summarize.py` fills the sidecar offline; the Trail Finder
+reads it and only calls OpenAI for parks that are missing or stale.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import pandas as pd
+
+from async_clients import chat
+from cache_backend import get_cache
+from model_router import ROUTES, Served, routed
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are still atomic, but concurrent writers aren't merged
+    fcntl = None
+
+SUMMARY_MODEL = ROUTES["trail_summary"].models[0]
+FALLBACK_CACHE_SECONDS = 3600
+SUMMARY_STORE = os.environ.get("SUMMARY_STORE", os.path.join("data", "trail_summaries.json"))
+
+
+def summary_messages(trail_data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Chat messages asking for a summary of one park."""
+    trail_info = "\n".join([f"{key}: {value}" for key, value in trail_data.items()])
+    prompt = f"""Analyze the following trail information and provide a concise summary including:
+    - Trail highlights
+    - Key features
+    - Best times to visit
+    - Any notable information
+
+    Trail Data:
+    {trail_info}"""
+    return [
+        {"role": "system", "content": "You are a knowledgeable park ranger providing helpful trail information."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def generate_summary(trail_data: Dict[str, Any], hedge: bool = True, use_cache: bool = True,
+                     interactive: bool = True) -> Served:
+    """Generate a summary through the model router, shared across workers by row content. Errors are raised."""
+    request = {"hash": row_hash(trail_data)}
+    if use_cache and (cached := get_cache().get("trail_summary", request)):
+        return Served(cached["summary"], cached["model"], cached["fallback"])
+    served = routed(
+        "trail_summary",
+        chat,
+        interactive=interactive,
+        hedge=hedge,
+        messages=summary_messages(trail_data),
+    )
+    # A fallback answer is only kept briefly so the primary model gets another chance
+    get_cache().set("trail_summary", request,
+                    {"summary": served.result, "model": served.model, "fallback": served.fallback},
+                    ttl=FALLBACK_CACHE_SECONDS if served.fallback else None)
+    return served
+
+
+def _canonical(value: Any) -> Optional[str]:
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    return str(value)
+
+
+def row_hash(trail_data: Dict[str, Any]) -> str:
+    """Content hash of a park row, independent of column order and missing-value type."""
+    canonical = {key: _canonical(value) for key, value in sorted(trail_data.items())}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SummaryStore:
+    """JSON sidecar of summaries keyed by OBJECTID, reloaded when the file changes.
+
+    Puts and removals are kept until `save`, which merges them into whatever
+    is on disk at that moment, so several writers don't drop each other's work.
+    """
+
+    def __init__(self, path: str = SUMMARY_STORE):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._removed: Set[str] = set()
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _merged(self, on_disk: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        entries = {key: entry for key, entry in on_disk.items() if key not in self._removed}
+        entries.update(self._pending)
+        return entries
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        self._entries = self._merged(self._read())
+        self._mtime = mtime
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def lookup(self, trail_data: Dict[str, Any]) -> Optional[Served]:
+        """Stored summary for this park, if it was generated from the same row content."""
+        with self._lock:
+            self._reload()
+            entry = self._entries.get(str(trail_data.get("objectid")))
+        if entry and entry["hash"] == row_hash(trail_data):
+            model = entry.get("model", SUMMARY_MODEL)
+            return Served(entry["summary"], model, model != SUMMARY_MODEL)
+        return None
+
+    def put(self, trail_data: Dict[str, Any], summary: str, model: str = SUMMARY_MODEL) -> None:
+        key = str(trail_data.get("objectid"))
+        with self._lock:
+            self._entries[key] = self._pending[key] = {
+                "hash": row_hash(trail_data),
+                "summary": summary,
+                "model": model,
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            }
+            self._removed.discard(key)
+
+    def remove(self, objectid: Any) -> None:
+        key = str(objectid)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._pending.pop(key, None)
+            self._removed.add(key)
+
+    def save(self) -> None:
+        """Merge our changes into the sidecar on disk and write it atomically (the batch job's checkpoint)."""
+        directory = os.path.dirname(self.path) or "."
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            with open(f"{self.path}.lock", "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    entries = self._merged(self._read())
+                    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp",
+                                                     prefix=f"{os.path.basename(self.path)}.", delete=False) as f:
+                        json.dump(entries, f, indent=1, sort_keys=True)
+                    os.replace(f.name, self.path)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+            self._entries = entries
+            self._pending.clear()
+            self._removed.clear()
+            self._mtime = os.path.getmtime(self.path)
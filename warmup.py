@@ -0,0 +1,217 @@
+"""Warm the server process up before it reports ready.
+
+Runs each warm-up step in the Streamlit server's own process (imports, the
+parks store, API clients, on-disk caches and the search/recommendation
+indexes), printing how long each one took, then starts Streamlit. Module-level
+state built here is what the pages use, so the first visitor doesn't pay for
+it. Once every step has succeeded and Streamlit answers its own health check,
+the process is marked ready:
+
+- `READY_FILE` is written with the step timings (and removed at launch), and
+- with `--health-port`, `GET /ready` answers 200 with the same JSON (503 before).
+
+    python warmup.py Main.py --server.port 8501
+    python warmup.py --health-port 8502 Main.py --server.headless true
+    python warmup.py --check                # run the steps and exit
+
+Warm-up options come first, then the script; everything after the script is
+passed to Streamlit unchanged.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+READY_FILE = os.environ.get("WARMUP_READY_FILE", os.path.join("data", "ready.json"))
+STREAMLIT_HEALTH_TIMEOUT_SECONDS = 120
+PAGE_DEPENDENCIES = [
+    "pandas", "numpy", "pyarrow.feather", "PIL.Image", "httpx", "openai", "googlemaps",
+    "folium", "streamlit", "streamlit_folium",
+    "async_clients", "cache_backend", "call_policy", "gazetteer", "image_assets", "job_queue", "model_router", "openai_governor",
+    "parks_store", "recommender", "session_store", "species_catalog", "trail_summaries",
+]
+
+_status: Dict[str, object] = {"ready": False, "steps": {}}
+
+
+def import_dependencies() -> str:
+    for module in PAGE_DEPENDENCIES:
+        importlib.import_module(module)
+    return f"{len(PAGE_DEPENDENCIES)} modules"
+
+
+def load_parks_store() -> str:
+    from parks_store import load_index, load_parks
+    index = load_index()
+    # Touch every partition so its pages are in the OS cache for the first query
+    parks = load_parks()
+    return f"{len(index)} parks in {index['partition'].nunique()} partitions ({len(parks)} rows read)"
+
+
+def open_clients() -> str:
+    from async_clients import maps_client, openai_client, run
+    run(asyncio.sleep(0))
+    openai_client()
+    if os.environ.get("GOOGLE_MAPS_API_KEY"):
+        maps_client()
+        return "event loop, OpenAI and Google Maps clients"
+    return "event loop and OpenAI client (no GOOGLE_MAPS_API_KEY)"
+
+
+def open_caches() -> str:
+    from cache_backend import get_cache
+    from trail_summaries import SummaryStore
+    summaries = SummaryStore()
+    entries = sum(c.get("entries", 0) for c in get_cache().stats().values())
+    return f"{len(summaries)} precomputed trail summaries, {entries} shared cache entries"
+
+
+def build_indexes() -> str:
+    import folium
+    from gazetteer import get_gazetteer
+    from recommender import get_recommender
+    from species_catalog import get_catalog
+    catalog = get_catalog()
+    recommender = get_recommender()
+    gazetteer = get_gazetteer()
+    # Rendering one map compiles folium's templates
+    folium.Map(location=[37.3382, -121.8863], zoom_start=12).get_root().render()
+    return (f"{len(catalog.species)} species, recommender over {len(recommender.parks)} parks, "
+            f"{len(gazetteer.cities)} cities and {len(gazetteer.zips)} ZIPs, map templates")
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], str]]] = [
+    ("imports", import_dependencies),
+    ("parks_store", load_parks_store),
+    ("clients", open_clients),
+    ("caches", open_caches),
+    ("indexes", build_indexes),
+]
+
+
+def run_warmup() -> Dict[str, dict]:
+    """Run every step, timing each; a failing step is reported but doesn't stop the others."""
+    steps: Dict[str, dict] = {}
+    for name, step in WARMUP_STEPS:
+        start = time.perf_counter()
+        try:
+            detail, ok = step(), True
+        except Exception as e:
+            detail, ok = f"{type(e).__name__}: {e}", False
+        elapsed = time.perf_counter() - start
+        steps[name] = {"ok": ok, "seconds": round(elapsed, 3), "detail": detail}
+        print(f"[warmup] {name:<12} {'ok ' if ok else 'ERR'} {elapsed * 1000:8.1f} ms  {detail}", flush=True)
+    print(f"[warmup] total {sum(s['seconds'] for s in steps.values()):.2f}s", flush=True)
+    return steps
+
+
+def mark_ready(steps: Dict[str, dict]) -> None:
+    """Write the readiness file and flip the health endpoint to 200."""
+    _status.update(ready=True, steps=steps, ready_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+    directory = os.path.dirname(READY_FILE) or "."
+    os.makedirs(directory, exist_ok=True)
+    # A temp file of our own, in case several server processes share the data directory
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, suffix=".tmp",
+                                     prefix=f"{os.path.basename(READY_FILE)}.", delete=False) as f:
+        json.dump(_status, f, indent=1)
+    os.replace(f.name, READY_FILE)
+    print(f"[warmup] ready ({READY_FILE})", flush=True)
+
+
+class ReadinessHandler(BaseHTTPRequestHandler):
+    """GET /ready: 200 once warmed up and serving, 503 before."""
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/ready", "/"):
+            self.send_error(404)
+            return
+        body = json.dumps(_status).encode("utf-8")
+        self.send_response(200 if _status["ready"] else 503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_health_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ReadinessHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="readiness", daemon=True).start()
+    return server
+
+
+def _streamlit_port(streamlit_args: List[str]) -> int:
+    for i, arg in enumerate(streamlit_args):
+        if arg.startswith("--server.port="):
+            return int(arg.split("=", 1)[1])
+        if arg == "--server.port" and i + 1 < len(streamlit_args):
+            return int(streamlit_args[i + 1])
+    return int(os.environ.get("STREAMLIT_SERVER_PORT", "8501"))
+
+
+def wait_until_serving(port: int, steps: Dict[str, dict],
+                       timeout: float = STREAMLIT_HEALTH_TIMEOUT_SECONDS) -> None:
+    """Mark ready once Streamlit's own health check answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    mark_ready(steps)
+                    return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    print(f"[warmup] Streamlit did not answer on port {port} within {timeout:.0f}s", flush=True)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Warm up, then start the Streamlit server.")
+    parser.add_argument("--health-port", type=int, default=int(os.environ.get("WARMUP_HEALTH_PORT", "0")),
+                        help="Serve GET /ready on this port (0 = readiness file only)")
+    parser.add_argument("--check", action="store_true", help="Run the warm-up steps and exit")
+    parser.add_argument("script", nargs="?", help="Streamlit entry script (required unless --check)")
+    parser.add_argument("streamlit_args", nargs=argparse.REMAINDER, help="Arguments passed on to Streamlit")
+    args = parser.parse_args(argv)
+    if not args.check and (args.script is None or not args.script.endswith(".py")):
+        parser.error("give the Streamlit script before any Streamlit options, e.g. warmup.py Main.py --server.port 8501")
+    streamlit_args = args.streamlit_args
+
+    try:
+        os.remove(READY_FILE)
+    except OSError:
+        pass
+    if args.health_port:
+        start_health_server(args.health_port)
+
+    steps = run_warmup()
+    if args.check:
+        sys.exit(0 if all(step["ok"] for step in steps.values()) else 1)
+
+    failed = [name for name, step in steps.items() if not step["ok"]]
+    if failed:
+        # Serve anyway, but the health endpoint keeps answering 503 with the failed steps
+        _status.update(steps=steps, failed=failed)
+        print(f"[warmup] not marking ready, failed step(s): {', '.join(failed)}", flush=True)
+    else:
+        threading.Thread(target=wait_until_serving, args=(_streamlit_port(streamlit_args), steps),
+                         name="readiness-probe", daemon=True).start()
+    # Start Streamlit in this process so the pages reuse everything warmed above
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", args.script, *streamlit_args]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()